@@ -6,8 +6,8 @@ import re
 import os
 import datetime
 import warnings
+import weakref
 
-from itertools import chain
 from contextlib import closing
 from collections import defaultdict
 
@@ -30,6 +30,9 @@ except (ImproperlyConfigured, AppRegistryNotReady):
     pass
 
 
+_FIELD_LOOKUPS = weakref.WeakKeyDictionary()
+
+
 def detect_primary_app():
 
     """
@@ -253,7 +256,11 @@ def inspect_delete(items, counts=False):
 
 
 def filter_field_dict(
-    dict, drop_nulls=True, empty_lists_are_null=False, drop_underscore_joins=True
+    dict,
+    drop_nulls=True,
+    empty_lists_are_null=False,
+    drop_underscore_joins=True,
+    model=None,
 ):
 
     """
@@ -263,6 +270,8 @@ def filter_field_dict(
     :param drop_nulls: If True (default=True), keys with null values are deleted (using utils.is_null())
     :param empty_lists_are_null: If True (default=False), empty lists are considered null
     :param drop_underscore_joins: If True (default=True), keys that contain "__" are dropped
+    :param model: Optional model class; if provided, keys that aren't fields on the model (other than "pk" and,
+    if they're being kept, "__" lookups) are dropped
     :return: The pruned dictionary
     """
 
@@ -281,6 +290,12 @@ def filter_field_dict(
             dict["object_id"] = dict["content_object"].pk
             del dict["content_object"]
 
+        if model:
+            lookup = get_field_lookup(model)
+            for k in list(dict.keys()):
+                if k not in lookup and k != "pk" and "__" not in k:
+                    del dict[k]
+
     return dict
 
 
@@ -294,7 +309,44 @@ def field_exists(model, field):
     :return: True if the field exists on the model, else False
     """
 
-    return field in get_all_field_names(model)
+    return field in get_field_lookup(model)
+
+
+def get_field_lookup(model):
+
+    """
+    Returns a dictionary that maps the names (and attnames, e.g. `foreign_key_id`) of all of the fields on a model to
+    the field objects. The dictionary is built once per model and cached. Django clears its internal `_meta` field
+    cache whenever the app registry is reloaded or a field is added, and the cached dictionary is rebuilt when that
+    happens. The returned dictionary is shared, so it shouldn't be modified.
+
+    :param model: A Django model class
+    :return: A dictionary of field names and field objects
+
+    Usage::
+
+        from django_pewtils import get_field_lookup
+
+        >>> get_field_lookup(Politician)["first_name"]
+        <django.db.models.fields.CharField: first_name>
+
+    """
+
+    fields = model._meta.get_fields()
+    cached = _FIELD_LOOKUPS.get(model)
+    if cached and cached[0] is fields:
+        return cached[1]
+    lookup = {}
+    for field in fields:
+        # For complete backwards compatibility, you may want to exclude
+        # GenericForeignKey from the results.
+        if field.many_to_one and field.related_model is None:
+            continue
+        lookup.setdefault(field.name, field)
+        if hasattr(field, "attname"):
+            lookup.setdefault(field.attname, field)
+    _FIELD_LOOKUPS[model] = (fields, lookup)
+    return lookup
 
 
 def get_all_field_names(model):
@@ -315,19 +367,7 @@ def get_all_field_names(model):
 
     """
 
-    return list(
-        set(
-            chain.from_iterable(
-                (field.name, field.attname)
-                if hasattr(field, "attname")
-                else (field.name,)
-                for field in model._meta.get_fields()
-                # For complete backwards compatibility, you may want to exclude
-                # GenericForeignKey from the results.
-                if not (field.many_to_one and field.related_model is None)
-            )
-        )
-    )
+    return list(get_field_lookup(model).keys())
 
 
 class AmbiguousConsolidationError(Exception):
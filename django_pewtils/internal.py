@@ -1,4 +1,6 @@
-def set_up_django_project(project_name, project_path, env_file=None):
+def set_up_django_project(
+    project_name, project_path, env_file=None, allow_async_unsafe=True
+):
 
     """
     Sets up a Django project and optionally loads in environment variables from a .env file.
@@ -14,6 +16,9 @@ def set_up_django_project(project_name, project_path, env_file=None):
     :param project_name:
     :param project_path:
     :param env_file:
+    :param allow_async_unsafe: If True (default), sets `DJANGO_ALLOW_ASYNC_UNSAFE` so that the ORM can be called
+    from inside of an event loop (e.g. in Jupyter). Set this to False when using the async helpers on
+    `BasicExtendedManager` (e.g. `achunk`), which run queries in Django's sync executor instead.
     :return:
     """
 
@@ -25,7 +30,8 @@ def set_up_django_project(project_name, project_path, env_file=None):
 
     from rasterio.env import GDALDataFinder
 
-    os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"] = "true"
+    if allow_async_unsafe:
+        os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"] = "true"
     os.environ["DJANGO_SETTINGS_MODULE"] = "{}.settings".format(project_name)
     os.environ["GDAL_DATA"] = GDALDataFinder().search()
 
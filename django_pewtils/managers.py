@@ -1,17 +1,69 @@
+from asgiref.sync import sync_to_async
 from builtins import str
+from django.apps import apps
+from django.contrib.postgres.fields import ArrayField
+from django.conf import settings
 from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
-from django.core.exceptions import EmptyResultSet
-from django.db import connection, models
-from django.db.models import Q
-from django_pewtils import field_exists, filter_field_dict, get_model, inspect_delete
-from pewanalytics.text import TextDataFrame, get_fuzzy_partial_ratio, get_fuzzy_ratio
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models, transaction
+from django.db.models import Max, Min, Q, Value, signals
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import MD5, Cast, Concat
+from django.db.models.query import ModelIterable
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django_pewtils import (
+    field_exists,
+    filter_field_dict,
+    get_field_lookup,
+    get_model,
+    inspect_delete,
+    reset_django_connection,
+)
+from pewanalytics.text import TextDataFrame
 from pewtils import chunk_list, is_null, decode_text, vector_concat_text
+from rapidfuzz import fuzz, process
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
 from tqdm import tqdm
+import asyncio
+import collections
+import heapq
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import numpy
 import os
 import pandas
+import pickle
+import queue
 import random
 import sys
+import tempfile
+import threading
+import time
 import traceback
+import uuid
+import weakref
+
+
+INTEGER_FIELD_TYPES = (
+    "AutoField",
+    "BigAutoField",
+    "SmallAutoField",
+    "IntegerField",
+    "BigIntegerField",
+    "SmallIntegerField",
+    "PositiveIntegerField",
+    "PositiveBigIntegerField",
+    "PositiveSmallIntegerField",
+)
+
+NULL_STRINGS = ("None", "nan", "", " ", "NaN", "none", "n/a", "NONE", "N/A")
+
+_WRITE_PLANS = weakref.WeakKeyDictionary()
 
 
 def _create_object(
@@ -59,8 +111,9 @@ def _create_object(
             )
         original_unique_data = unique_data
         if update_data:
+            fields = get_field_lookup(model)
             for field in list(update_data.keys()):
-                if field_exists(model, field) and field not in list(unique_data.keys()):
+                if field in fields and field not in unique_data:
                     unique_data[field] = update_data[field]
         try:
             existing = model.objects.create(**unique_data)
@@ -106,6 +159,100 @@ def _create_object(
     return existing
 
 
+def _get_write_plan(model):
+
+    """
+    Returns the precomputed "write plan" that `_merge_update_data` and `_update_object` use to apply updates to
+    objects of a model, which is built once per model and cached until the model's fields change (see
+    `get_field_lookup`). The plan is a tuple of:
+        - A dictionary mapping each field name (and attname) to a tuple of the concrete field's name (or None if the \
+        field isn't concrete, e.g. a many-to-many field) and its attname if it's a relation (or None)
+        - The names of any `auto_now` fields, which always need to be saved
+        - Whether or not partial saves with `update_fields` are safe, which is only the case if the model doesn't \
+        override `save` (since a custom `save` method might modify other fields)
+
+    :param model: A Django model class
+    :return: The write plan
+    """
+
+    fields = get_field_lookup(model)
+    cached = _WRITE_PLANS.get(model)
+    if cached and cached[0] is fields:
+        return cached[1]
+    targets = {}
+    for name, field in fields.items():
+        if getattr(field, "concrete", False):
+            targets[name] = (field.name, field.attname if field.is_relation else None)
+        else:
+            targets[name] = (None, None)
+    auto_now = [
+        f.name for f in model._meta.concrete_fields if getattr(f, "auto_now", False)
+    ]
+    plan = (targets, auto_now, model.save is models.Model.save)
+    _WRITE_PLANS[model] = (fields, plan)
+    return plan
+
+
+def _merge_update_data(
+    model,
+    existing,
+    update_data,
+    empty_lists_are_null=True,
+    only_update_existing_nulls=False,
+    allow_list_overlaps=False,
+):
+
+    """
+    Sets the values in `update_data` on an object in memory, without saving it, using the model's write plan (see
+    `_get_write_plan`). Fields that don't exist on the model are skipped; if `only_update_existing_nulls` is True,
+    fields that already have a value are skipped; and if `allow_list_overlaps` is True, list values are merged into the
+    existing lists rather than replacing them. Relations can be set with either an object or a primary key, and are
+    compared using their primary keys, so the related objects are never loaded. Values that are the same as the
+    object's current values are skipped.
+
+    :param model: The model the object belongs to
+    :param existing: The object to update
+    :param update_data: A dictionary of fields and values, already filtered with `filter_field_dict`
+    :param empty_lists_are_null: Whether or not to consider empty lists as being null
+    :param only_update_existing_nulls: If `True`, only update fields whose current value is null
+    :param allow_list_overlaps: If `True`, merge list values into existing lists
+    :return: A list of the names of the fields that were changed
+    """
+
+    targets = _get_write_plan(model)[0]
+    updated_fields = []
+    for field, value in update_data.items():
+        target = targets.get(field)
+        if not target:
+            continue
+        name, attname = target
+        if attname:
+            current = getattr(existing, attname)
+            raw_value = value.pk if isinstance(value, models.Model) else value
+        else:
+            current = getattr(existing, field) if name else None
+            raw_value = value
+        if only_update_existing_nulls and not is_null(
+            current, empty_lists_are_null=empty_lists_are_null
+        ):
+            continue
+        if allow_list_overlaps and isinstance(current, list):
+            value = list(current)
+            for val in update_data[field]:
+                if val not in value:
+                    value.append(val)
+            raw_value = value
+        if name and type(current) is type(raw_value) and current == raw_value:
+            continue
+        if attname and not isinstance(value, models.Model):
+            setattr(existing, attname, value)
+        else:
+            setattr(existing, field, value)
+        updated_fields.append(field)
+
+    return updated_fields
+
+
 def _update_object(
     model,
     existing,
@@ -124,7 +271,10 @@ def _update_object(
     determines whether or not null values should be saved to the existing object.  The "empty_lists_are_null" parameter
     determines whether or not empty lists should be treated as nulls.  The "only_update_existing_nulls" parameter
     determines whether or not existing data on the object will be overwritten; if True, then only empty fields
-    will be written, and existing non-null data will be preserved.
+    will be written, and existing non-null data will be preserved.  The object is always saved (so save signals are
+    sent and `auto_now` fields are refreshed), but where possible only the fields that changed and any `auto_now`
+    fields are written, using `update_fields`.  If the model overrides `save`, or `save_kwargs` are provided, the
+    whole object is saved.
 
     :param model: The model the object belongs to
     :param existing: The existing object
@@ -145,26 +295,23 @@ def _update_object(
                 drop_nulls=(not save_nulls),
                 empty_lists_are_null=empty_lists_are_null,
             )
-            for field in list(update_data.keys()):
-                if field_exists(model, field) and (
-                    not only_update_existing_nulls
-                    or is_null(
-                        getattr(existing, field),
-                        empty_lists_are_null=empty_lists_are_null,
-                    )
-                ):
-                    if (
-                        isinstance(getattr(existing, field), list)
-                        and allow_list_overlaps
-                    ):
-                        vals = list(getattr(existing, field))
-                        for val in update_data[field]:
-                            if val not in vals:
-                                vals.append(val)
-                        setattr(existing, field, vals)
-                    else:
-                        setattr(existing, field, update_data[field])
-            existing.save(**save_kwargs)
+            changed = _merge_update_data(
+                model,
+                existing,
+                update_data,
+                empty_lists_are_null=empty_lists_are_null,
+                only_update_existing_nulls=only_update_existing_nulls,
+                allow_list_overlaps=allow_list_overlaps,
+            )
+            targets, auto_now, partial_save = _get_write_plan(model)
+            update_fields = set(targets[field][0] for field in changed)
+            update_fields.update(auto_now)
+            if save_kwargs or not partial_save or None in update_fields:
+                existing.save(**save_kwargs)
+            elif update_fields:
+                existing.save(update_fields=list(update_fields))
+            else:
+                existing.save()
             if command_log and hasattr(existing, "command_logs"):
                 existing.command_logs.add(command_log)
                 existing.commands.add(command_log.command)
@@ -180,6 +327,1056 @@ def _update_object(
     return existing
 
 
+def _get_conflict_fields(model, field_names):
+
+    """
+    Checks whether a set of `unique_data` keys corresponds exactly to a unique constraint on a model (the primary
+    key, a unique field, a `unique_together` set, or an unconditional `UniqueConstraint`), which is required to use
+    them as the conflict target of an `INSERT ... ON CONFLICT` statement.
+
+    :param model: A Django model class
+    :param field_names: The names of the fields to check
+    :return: A list of the matching fields, or None if there's no matching constraint
+    """
+
+    try:
+        fields = [_get_lookup_field(model, f) for f in field_names]
+    except FieldDoesNotExist:
+        return None
+    names = set(f.name for f in fields)
+    candidates = [(f.name,) for f in model._meta.local_concrete_fields if f.unique]
+    candidates.extend(tuple(f) for f in model._meta.unique_together)
+    for constraint in model._meta.constraints:
+        if isinstance(constraint, models.UniqueConstraint) and not constraint.condition:
+            candidates.append(tuple(constraint.fields))
+    for candidate in candidates:
+        if names == set(candidate):
+            return fields
+    return None
+
+
+def _upsert_object(
+    model,
+    unique_data,
+    update_data=None,
+    save_nulls=False,
+    empty_lists_are_null=True,
+    only_update_existing_nulls=False,
+    allow_list_overlaps=False,
+    using=None,
+):
+
+    """
+    Creates or updates an object in a single `INSERT ... ON CONFLICT (...) DO UPDATE ... RETURNING` statement, as an
+    alternative to the select-then-save logic in `_create_object` and `_update_object`. The `unique_data` keys must
+    match a unique constraint on the model. When `only_update_existing_nulls` is True, existing non-null values are
+    preserved, and when `allow_list_overlaps` is True, new values in ArrayFields are appended to the existing arrays
+    (skipping duplicates) rather than replacing them. As with `save`, `auto_now` fields are set to the current time
+    whenever the row is updated. Since the row is written directly, the model's `save` method and save signals are
+    not run.
+
+    :param model: The model the object is on
+    :param unique_data: A dictionary of fields that match a unique constraint on the model
+    :param update_data: A dictionary of fields to set on the object
+    :param save_nulls: Whether or not to save null values in `update_data`
+    :param empty_lists_are_null: Whether or not empty lists should be considered null
+    :param only_update_existing_nulls: If True, only currently-null fields on an existing row will be updated
+    :param allow_list_overlaps: If True, list values will be merged into existing arrays
+    :param using: The database alias to use
+    :return: The created or updated object, or None if the upsert can't be expressed for this model and data
+    """
+
+    db = connections[using or DEFAULT_DB_ALIAS]
+    if db.vendor != "postgresql" or model._meta.parents:
+        return None
+    unique_data = filter_field_dict(
+        dict(unique_data),
+        drop_nulls=(not save_nulls),
+        empty_lists_are_null=empty_lists_are_null,
+    )
+    update_data = filter_field_dict(
+        dict(update_data or {}),
+        drop_nulls=(not save_nulls),
+        empty_lists_are_null=empty_lists_are_null,
+    )
+    conflict_fields = _get_conflict_fields(model, list(unique_data.keys()))
+    if not conflict_fields:
+        return None
+    fields = get_field_lookup(model)
+    update_fields = []
+    for name in list(update_data.keys()):
+        field = fields.get(name)
+        if not field:
+            del update_data[name]
+            continue
+        if not field.concrete:
+            return None
+        if field not in conflict_fields and field not in update_fields:
+            update_fields.append(field)
+    # auto_now fields are refreshed on every update, as they would be by `save`
+    auto_now = [
+        fields[name]
+        for name in _get_write_plan(model)[1]
+        if fields[name] not in conflict_fields and fields[name] not in update_fields
+    ]
+
+    insert_data = dict(unique_data)
+    for name, value in update_data.items():
+        if name not in insert_data:
+            insert_data[name] = value
+    obj = model(**insert_data)
+
+    qn = db.ops.quote_name
+    insert_fields = [
+        f
+        for f in model._meta.local_concrete_fields
+        if not (isinstance(f, models.AutoField) and obj.pk is None)
+    ]
+    params = [f.get_db_prep_save(f.pre_save(obj, True), db) for f in insert_fields]
+
+    assignments = []
+    for field in update_fields + auto_now or conflict_fields[:1]:
+        column = "existing.{}".format(qn(field.column))
+        value = "EXCLUDED.{}".format(qn(field.column))
+        if allow_list_overlaps and isinstance(field, ArrayField):
+            value = (
+                "array_cat({0}, ARRAY("
+                "SELECT u.v FROM unnest({1}) WITH ORDINALITY AS u(v, n) "
+                "WHERE {0} IS NULL OR NOT u.v = ANY({0}) "
+                "GROUP BY u.v ORDER BY min(u.n)))".format(column, value)
+            )
+        if only_update_existing_nulls and field in update_fields:
+            is_null = "{} IS NULL".format(column)
+            if isinstance(field, ArrayField) and empty_lists_are_null:
+                is_null += " OR cardinality({}) = 0".format(column)
+            elif isinstance(field, (models.CharField, models.TextField)):
+                is_null += " OR {} IN ({})".format(
+                    column, ", ".join(["%s"] * len(NULL_STRINGS))
+                )
+                params.extend(NULL_STRINGS)
+            value = "CASE WHEN {} THEN {} ELSE {} END".format(is_null, value, column)
+        assignments.append("{} = {}".format(qn(field.column), value))
+
+    returning = model._meta.concrete_fields
+    query = (
+        "INSERT INTO {table} AS existing ({columns}) VALUES ({values}) "
+        "ON CONFLICT ({conflict}) DO UPDATE SET {assignments} "
+        "RETURNING {returning}".format(
+            table=qn(model._meta.db_table),
+            columns=", ".join(qn(f.column) for f in insert_fields),
+            values=", ".join(["%s"] * len(insert_fields)),
+            conflict=", ".join(qn(f.column) for f in conflict_fields),
+            assignments=", ".join(assignments),
+            returning=", ".join(
+                "existing.{}".format(qn(f.column)) for f in returning
+            ),
+        )
+    )
+    with db.cursor() as cursor:
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+
+    values = []
+    for field, value in zip(returning, row):
+        col = field.get_col(model._meta.db_table)
+        for converter in db.ops.get_db_converters(col) + col.get_db_converters(db):
+            value = converter(value, col, db)
+        values.append(value)
+
+    return model.from_db(db.alias, [f.attname for f in returning], values)
+
+
+def _is_indexed(model, field_name):
+
+    """
+    Checks whether a `unique_data` key refers to a field that can be looked up with an index on its own: the primary
+    key, a unique or `db_index` field (including foreign keys), or the first field of an index, `unique_together`,
+    `index_together` or `UniqueConstraint`.
+
+    :param model: A Django model class
+    :param field_name: The name of the field
+    :return: True if the field is the leading column of an index, else False
+    """
+
+    try:
+        field = _get_lookup_field(model, field_name)
+    except FieldDoesNotExist:
+        return False
+    if field.primary_key or field.unique or field.db_index:
+        return True
+    leading = [
+        index.fields[0].lstrip("-") for index in model._meta.indexes if index.fields
+    ]
+    leading.extend(fields[0] for fields in model._meta.unique_together)
+    leading.extend(fields[0] for fields in model._meta.index_together)
+    leading.extend(
+        constraint.fields[0]
+        for constraint in model._meta.constraints
+        if isinstance(constraint, models.UniqueConstraint) and not constraint.condition
+    )
+    return field.name in leading
+
+
+def _freeze_value(value):
+
+    """
+    Converts a value into a hashable equivalent so it can be used as part of a lookup key: lists become tuples,
+    dictionaries become sorted tuples of items, and model instances are replaced by their primary keys.
+
+    :param value: The value to convert
+    :return: A hashable version of the value
+    """
+
+    if isinstance(value, models.Model):
+        return value.pk
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze_value(v) for v in value)
+    elif isinstance(value, dict):
+        return tuple(sorted((k, _freeze_value(v)) for k, v in value.items()))
+    return value
+
+
+def _get_lookup_field(model, field_name):
+
+    """
+    Returns the model field that a `unique_data` key refers to, resolving `pk` to the primary key.
+
+    :param model: A Django model class
+    :param field_name: The name (or attname) of the field, or `pk`
+    :return: The field object
+    """
+
+    if field_name == "pk":
+        return model._meta.pk
+    return model._meta.get_field(field_name)
+
+
+def _normalize_lookup_value(field, value):
+
+    """
+    Coerces a lookup value to the Python type that the field holds once loaded from the database, so lookup
+    values can be compared against attribute values on existing objects (e.g. `"1"` vs `1`, or a related object vs
+    its primary key).
+
+    :param field: The model field
+    :param value: The lookup value
+    :return: A hashable, normalized version of the value
+    """
+
+    if isinstance(value, models.Model):
+        value = value.pk
+    if value is not None:
+        if field.is_relation:
+            value = field.target_field.to_python(value)
+        else:
+            value = field.to_python(value)
+    return _freeze_value(value)
+
+
+class LookupCache(object):
+
+    """
+    A bounded, least-recently-used identity map of the objects found or created by `get_if_exists` and
+    `create_or_update` when they're called with `use_cache=True`. Repeated lookups with the same `unique_data` return
+    the same object instance without querying the database. Entries are invalidated when their objects are deleted,
+    or when they're saved in a way that means they may no longer match the lookup (saving a different instance with
+    the same primary key, or changing one of the lookup fields on the cached instance). Changes made without sending
+    signals (e.g. `QuerySet.update` or raw SQL) aren't detected, so the cache should only be used when this process
+    is responsible for the writes to the relevant tables. The bulk write methods on `BasicExtendedManager`
+    (`bulk_create_or_update`, `copy_from_iterable`/`copy_from_df`, `chunk_update` and `chunk_delete(fast=True)`)
+    clear the cached lookups for the models they write to. A module-level instance is available as `lookup_cache`.
+
+    :param maxsize: The maximum number of lookups to keep
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._objects = collections.OrderedDict()
+        self._keys = {}
+        self._lock = threading.RLock()
+        self._connected = False
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get(self, key):
+
+        """
+        :param key: A lookup key from `_get_lookup_cache_key`
+        :return: The cached object, or None if it's not in the cache
+        """
+
+        with self._lock:
+            obj = self._objects.get(key)
+            if obj is None:
+                self.misses += 1
+            else:
+                self._objects.move_to_end(key)
+                self.hits += 1
+            return obj
+
+    def set(self, key, obj):
+
+        """
+        Adds an object to the cache, evicting the least recently used lookups if the cache is full.
+
+        :param key: A lookup key from `_get_lookup_cache_key`
+        :param obj: The object to cache
+        """
+
+        if not self._connected:
+            signals.post_save.connect(
+                _invalidate_lookup_cache, dispatch_uid="django_pewtils_lookup_cache"
+            )
+            signals.post_delete.connect(
+                _invalidate_lookup_cache, dispatch_uid="django_pewtils_lookup_cache"
+            )
+            self._connected = True
+        with self._lock:
+            if key in self._objects:
+                self._forget(key)
+            self._objects[key] = obj
+            self._keys.setdefault((key[0], key[1], obj.pk), set()).add(key)
+            while len(self._objects) > self.maxsize:
+                self._forget(next(iter(self._objects)))
+
+    def discard(self, instance, using, keep=False):
+
+        """
+        Removes the lookups that refer to an object from the cache.
+
+        :param instance: A model object
+        :param using: The database alias the object belongs to
+        :param keep: If True, lookups for which `instance` itself is cached and still matches are kept
+        """
+
+        with self._lock:
+            ref = (instance._meta.label, using, instance.pk)
+            for key in list(self._keys.get(ref, [])):
+                if not (
+                    keep
+                    and self._objects[key] is instance
+                    and _lookup_matches(instance, key)
+                ):
+                    self._forget(key)
+
+    def discard_model(self, model):
+
+        """
+        Removes every lookup for a model from the cache.
+
+        :param model: A Django model class
+        """
+
+        with self._lock:
+            for key in [k for k in self._objects if k[0] == model._meta.label]:
+                self._forget(key)
+
+    def clear(self):
+
+        """
+        Empties the cache and resets the hit and miss counters.
+        """
+
+        with self._lock:
+            self._objects.clear()
+            self._keys.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _forget(self, key):
+        obj = self._objects.pop(key)
+        ref = (key[0], key[1], obj.pk)
+        keys = self._keys.get(ref, set())
+        keys.discard(key)
+        if not keys:
+            self._keys.pop(ref, None)
+
+
+lookup_cache = LookupCache()
+
+
+def _get_lookup_cache_key(queryset, unique_data, *options):
+
+    """
+    Builds a `lookup_cache` key from a `get_if_exists` lookup. Values are normalized to the types of the fields
+    they refer to (so that e.g. `{"pk": "1"}` and `{"pk": 1}` share an entry). Lookups on filtered QuerySets, and
+    lookups with unhashable values, can't be cached.
+
+    :param queryset: The QuerySet the lookup is run on
+    :param unique_data: The dictionary of filter values
+    :param options: Any other parameters that affect the result of the lookup
+    :return: A hashable key, or None if the lookup can't be cached
+    """
+
+    if queryset.query.where:
+        return None
+    items = []
+    for name, value in unique_data.items():
+        try:
+            value = _normalize_lookup_value(
+                _get_lookup_field(queryset.model, name), value
+            )
+        except Exception:
+            value = _freeze_value(value)
+        items.append((name, value))
+    key = (
+        queryset.model._meta.label,
+        queryset.db,
+        tuple(sorted(items, key=lambda i: i[0])),
+        options,
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _lookup_matches(instance, key):
+
+    """
+    Checks whether an object still matches a cached `get_if_exists` lookup after it's been modified. Only exact
+    lookups on model fields can be checked; anything else (e.g. `match_any`, `__` lookups or list overlaps) is
+    assumed not to match.
+
+    :param instance: A model object
+    :param key: A lookup key from `_get_lookup_cache_key`
+    :return: True if the object is known to match the lookup
+    """
+
+    match_any, search_nulls, empty_lists_are_null, allow_list_overlaps = key[3]
+    if match_any:
+        return False
+    for name, value in key[2]:
+        if isinstance(value, tuple):
+            if allow_list_overlaps:
+                return False
+            if not value and empty_lists_are_null and not search_nulls:
+                continue
+        elif is_null(value) and not search_nulls:
+            continue
+        try:
+            field = _get_lookup_field(instance._meta.model, name)
+        except FieldDoesNotExist:
+            return False
+        if value != _freeze_value(getattr(instance, field.attname)):
+            return False
+    return True
+
+
+def _invalidate_lookup_cache(sender, instance, using, **kwargs):
+
+    """
+    Signal receiver that removes saved or deleted objects from `lookup_cache`. Objects that were saved keep their
+    entries if they're the cached instance and still match the lookup.
+    """
+
+    lookup_cache.discard(instance, using, keep="created" in kwargs)
+
+
+def _chunk_iterable(iterable, size):
+
+    """
+    Like `pewtils.chunk_list`, but for iterables of unknown length (e.g. generators or streamed QuerySets); groups
+    values into lists of `size` without loading the whole iterable.
+
+    :param iterable: Any iterable
+    :param size: Desired size of each list
+    :return: An iterable that yields lists
+    """
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _copy_array_literal(values):
+
+    """
+    Formats a list as a Postgres array literal (e.g. `{"a","b"}`) for use in a `COPY` stream.
+
+    :param values: A list of values (may be nested)
+    :return: The array literal
+    """
+
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append("NULL")
+        elif isinstance(value, (list, tuple)):
+            elements.append(_copy_array_literal(value))
+        else:
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            elements.append('"{}"'.format(value))
+    return "{" + ",".join(elements) + "}"
+
+
+def _copy_text(field, value):
+
+    """
+    Converts a Python value into the text representation that Postgres expects for a field in a CSV `COPY` stream.
+    Missing values (`None`, `NaN`, `NaT`) become nulls, and other values are first normalized with the field's
+    `to_python`, so that e.g. numpy scalars, or integers that Pandas has stored as floats because their column
+    contains nulls, are written in the field's own format.
+
+    :param field: The model field the value belongs to
+    :param value: The value to convert
+    :return: A string, or None for null values
+    """
+
+    if isinstance(value, models.Model):
+        value = value.pk
+    if value is None or (pandas.api.types.is_scalar(value) and pandas.isnull(value)):
+        return None
+    if isinstance(field, ArrayField):
+        return _copy_array_literal(value)
+    value = field.to_python(value)
+    if isinstance(value, (dict, list)) or field.get_internal_type() == "JSONField":
+        return json.dumps(value)
+    elif isinstance(value, bool):
+        return "t" if value else "f"
+    elif isinstance(value, bytes):
+        return "\\x" + value.hex()
+    elif hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _copy_csv_row(values):
+
+    """
+    Formats a row of values (already converted with `_copy_text`) as a line of CSV for `COPY`, quoting everything
+    except nulls so that they can be distinguished from empty strings.
+
+    :param values: A list of strings or None
+    :return: The CSV line
+    """
+
+    return (
+        ",".join(
+            "\\N" if v is None else '"{}"'.format(v.replace('"', '""')) for v in values
+        )
+        + "\n"
+    )
+
+
+def _get_arrow_type(field):
+
+    """
+    Maps a Django model field to the equivalent Apache Arrow type, along with a function that converts the values
+    Django loads from the database into values Arrow accepts. Relations take the type of the field they point to,
+    ArrayFields become list columns, JSONFields are serialized to strings, and datetimes are timezone-aware
+    timestamps when `USE_TZ` is enabled. Unrecognized fields are converted to strings.
+
+    :param field: A Django model field
+    :return: A tuple of `(arrow_type, converter)`, where `converter` is None if no conversion is needed
+    """
+
+    import pyarrow
+
+    if field.is_relation:
+        return _get_arrow_type(field.target_field)
+    if isinstance(field, ArrayField):
+        base_type, base_converter = _get_arrow_type(field.base_field)
+        converter = None
+        if base_converter:
+
+            def convert_list(value):
+                return [None if v is None else base_converter(v) for v in value]
+
+            converter = convert_list
+        return pyarrow.list_(base_type), converter
+
+    internal_type = field.get_internal_type()
+    if internal_type in ("BigAutoField", "BigIntegerField", "PositiveBigIntegerField"):
+        return pyarrow.int64(), None
+    elif internal_type in ("SmallAutoField", "SmallIntegerField", "PositiveSmallIntegerField"):
+        return pyarrow.int16(), None
+    elif internal_type in INTEGER_FIELD_TYPES:
+        return pyarrow.int32(), None
+    elif internal_type == "FloatField":
+        return pyarrow.float64(), None
+    elif internal_type == "DecimalField":
+        return pyarrow.decimal128(field.max_digits, field.decimal_places), None
+    elif internal_type in ("BooleanField", "NullBooleanField"):
+        return pyarrow.bool_(), None
+    elif internal_type == "DateTimeField":
+        return pyarrow.timestamp("us", tz="UTC" if settings.USE_TZ else None), None
+    elif internal_type == "DateField":
+        return pyarrow.date32(), None
+    elif internal_type == "TimeField":
+        return pyarrow.time64("us"), None
+    elif internal_type == "DurationField":
+        return pyarrow.duration("us"), None
+    elif internal_type == "BinaryField":
+        return pyarrow.binary(), bytes
+    elif internal_type == "JSONField":
+        return pyarrow.string(), json.dumps
+    elif internal_type in ("CharField", "TextField"):
+        return pyarrow.string(), None
+    return pyarrow.string(), str
+
+
+def _parse_array_literal(field, value):
+
+    """
+    Parses a Postgres array literal (e.g. `{a,"b,c",NULL}`), as exported by `COPY`, into a list of Python values
+    using the ArrayField's base field.
+
+    :param field: An ArrayField
+    :param value: The array literal
+    :return: A (possibly nested) list of values
+    """
+
+    from psycopg2.extensions import UNICODEARRAY
+
+    def convert(values):
+        return [
+            convert(v)
+            if isinstance(v, list)
+            else (None if v is None else field.base_field.to_python(v))
+            for v in values
+        ]
+
+    return convert(UNICODEARRAY(value, None))
+
+
+def _convert_df_column(series, field):
+
+    """
+    Converts a DataFrame column to the most compact Pandas dtype for the model field it was loaded from. Integers
+    become nullable extension dtypes (`Int64`, `Int32` or `Int16`) rather than floats, booleans become the nullable
+    `boolean` dtype, CharFields with `choices` become categoricals, dates and datetimes are parsed into `datetime64`
+    columns (UTC when `USE_TZ` is enabled), and array literals exported by `COPY` are parsed into lists. Columns of
+    any other type are returned unchanged.
+
+    :param series: A Pandas Series
+    :param field: The model field the column was loaded from
+    :return: The converted Series
+    """
+
+    if field.is_relation:
+        return _convert_df_column(series, field.target_field)
+    if isinstance(field, ArrayField):
+        return series.map(
+            lambda v: _parse_array_literal(field, v) if isinstance(v, str) else v
+        )
+
+    internal_type = field.get_internal_type()
+    if internal_type in ("BigAutoField", "BigIntegerField", "PositiveBigIntegerField"):
+        return series.astype("Int64")
+    elif internal_type in ("SmallAutoField", "SmallIntegerField", "PositiveSmallIntegerField"):
+        return series.astype("Int16")
+    elif internal_type in INTEGER_FIELD_TYPES:
+        return series.astype("Int32")
+    elif internal_type in ("BooleanField", "NullBooleanField"):
+        return series.map({"t": True, "f": False, True: True, False: False}).astype(
+            "boolean"
+        )
+    elif internal_type == "DateTimeField":
+        return pandas.to_datetime(series, utc=settings.USE_TZ)
+    elif internal_type == "DateField":
+        return pandas.to_datetime(series)
+    elif internal_type in ("CharField", "TextField") and field.choices:
+        categories = [str(value) for value, _ in field.flatchoices]
+        extra = set(series.dropna().astype(str).unique()).difference(categories)
+        return series.astype(pandas.CategoricalDtype(categories + sorted(extra)))
+    return series
+
+
+def _apply_model_dtypes(df, model):
+
+    """
+    Converts the columns of a DataFrame loaded from a model's table to typed Pandas dtypes based on the model's
+    fields (see `_convert_df_column`). Columns are matched to fields by database column name, falling back to the
+    field name; columns that don't correspond to a field (e.g. annotations) are left as-is.
+
+    :param df: A Pandas DataFrame
+    :param model: The model the DataFrame was loaded from
+    :return: The DataFrame, with its columns converted
+    """
+
+    fields = {}
+    for field in model._meta.concrete_fields:
+        fields[field.column] = field
+        fields.setdefault(field.name, field)
+    for column in df.columns:
+        if column in fields:
+            df[column] = _convert_df_column(df[column], fields[column])
+    return df
+
+
+def _fuzzy_score_matrix(
+    texts,
+    queries,
+    min_ratio=None,
+    allow_partial=False,
+    max_partial_difference=100,
+    score_cutoff=None,
+    workers=1,
+    dtype=numpy.float64,
+):
+
+    """
+    Scores a list of strings against one or more query strings in a single vectorized call to :py:mod:`rapidfuzz`'s
+    `process.cdist`, following the same rules as `fuzzy_ratios`. If `allow_partial` is True, each score is the
+    greater of the fuzzy ratio and the partial fuzzy ratio, and pairs where the two differ by more than
+    `max_partial_difference` are excluded.
+
+    :param texts: A list of strings
+    :param queries: A list of strings to compare them to
+    :param min_ratio: The minimum score for a pair to be kept
+    :param allow_partial: Whether or not to use partial fuzzy ratios
+    :param max_partial_difference: The maximum difference between the fuzzy ratio and partial fuzzy ratio
+    :param score_cutoff: Optional cutoff passed to `rapidfuzz`; ratios below it are skipped early and set to zero.
+    Can't be used with `allow_partial`, since the exact ratios are needed to compare them to the partial ratios.
+    :param workers: The number of threads `rapidfuzz` should use (-1 uses all available cores)
+    :param dtype: The numpy type of the score matrix; `numpy.float32` halves the memory used, at the cost of precision
+    :return: A tuple of two arrays, each with a row for every string and a column for every query: the scores, and
+    a boolean mask of the pairs that should be kept
+    """
+
+    scores = process.cdist(
+        texts,
+        queries,
+        scorer=fuzz.ratio,
+        dtype=dtype,
+        score_cutoff=score_cutoff,
+        workers=workers,
+    )
+    keep = numpy.ones(scores.shape, dtype=bool)
+    if allow_partial:
+        partial_scores = process.cdist(
+            texts,
+            queries,
+            scorer=fuzz.partial_ratio,
+            dtype=dtype,
+            workers=workers,
+        )
+        keep &= numpy.abs(scores - partial_scores) <= max_partial_difference
+        scores = numpy.maximum(scores, partial_scores)
+    if min_ratio:
+        keep &= scores >= min_ratio
+    if score_cutoff:
+        keep &= scores >= score_cutoff
+    return scores, keep
+
+
+def _fuzzy_scores(texts, text, **kwargs):
+
+    """
+    Scores a list of strings against a single comparison text; see `_fuzzy_score_matrix`.
+
+    :param texts: A list of strings
+    :param text: The text to compare them to
+    :param kwargs: Additional arguments to pass to `_fuzzy_score_matrix`
+    :return: A tuple of two arrays: the scores, and a boolean mask of the strings that should be kept
+    """
+
+    scores, keep = _fuzzy_score_matrix(texts, [text], **kwargs)
+    return scores[:, 0], keep[:, 0]
+
+
+def _estimated_count(queryset):
+
+    """
+    Returns a cheap estimate of the number of rows in a QuerySet. On Postgres, this is the row estimate from the
+    query planner (via `EXPLAIN`), which avoids scanning the table; on other backends it falls back to `count()`.
+
+    :param queryset: A Django QuerySet
+    :return: The estimated number of rows
+    """
+
+    try:
+        query, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    db = connections[queryset.db]
+    if db.vendor != "postgresql":
+        return queryset.count()
+    with db.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) {}".format(query), params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _has_integer_pk(model):
+
+    """
+    Checks whether a model's primary key is an integer column, which is required for range-based operations.
+
+    :param model: A Django model class
+    :return: True if the primary key is an integer field, else False
+    """
+
+    return model._meta.pk.get_internal_type() in INTEGER_FIELD_TYPES
+
+
+def _get_fast_delete_plan(model, chain=None):
+
+    """
+    Walks the relations pointing at a model and builds a list of the bulk SQL operations needed to delete its rows
+    without going through Django's `Collector`. Each step is a tuple of `(model, action, chain)`, where `action` is
+    either `"delete"` or `"set_null"` and `chain` is the list of `(model, foreign_key)` hops that lead from the
+    original model to the affected one. Steps are ordered so that dependent rows are handled before the rows they
+    depend on. An exception is raised if any part of the cascade can't be expressed in SQL (signal receivers,
+    multi-table inheritance, generic relations, recursive cascades, or `on_delete` behaviors other than `CASCADE`,
+    `SET_NULL` and `DO_NOTHING`).
+
+    :param model: The model whose rows will be deleted
+    :param chain: Recursive parameter tracking the relations that lead to `model`
+    :return: A list of `(model, action, chain)` steps
+    """
+
+    chain = chain or []
+    if model._meta.parents:
+        raise Exception("{} uses multi-table inheritance and can't be fast-deleted".format(model))
+    if any(hasattr(f, "bulk_related_objects") for f in model._meta.private_fields):
+        raise Exception("{} has generic relations and can't be fast-deleted".format(model))
+    if any(
+        receiver is not _invalidate_lookup_cache
+        for signal in (signals.pre_delete, signals.post_delete)
+        for receiver in signal._live_receivers(model)
+    ):
+        raise Exception("{} has delete signal receivers and can't be fast-deleted".format(model))
+
+    ancestors = [model] + [m for m, _ in chain]
+    steps = []
+    for related in get_candidate_relations_to_delete(model._meta):
+        related_model = related.related_model
+        link = chain + [(related_model, related.field)]
+        if related.on_delete == models.DO_NOTHING:
+            continue
+        elif related.on_delete == models.SET_NULL:
+            steps.append((related_model, "set_null", link))
+        elif related.on_delete == models.CASCADE:
+            if related_model in ancestors:
+                raise Exception(
+                    "{}.{} cascades recursively and can't be fast-deleted".format(
+                        related_model, related.field.name
+                    )
+                )
+            steps.extend(_get_fast_delete_plan(related_model, chain=link))
+        else:
+            raise Exception(
+                "{}.{} has an on_delete behavior that can't be fast-deleted".format(
+                    related_model, related.field.name
+                )
+            )
+    steps.append((model, "delete", chain))
+
+    return steps
+
+
+def _get_fast_delete_queryset(queryset, chain):
+
+    """
+    Follows a chain of foreign keys from a QuerySet to the related rows that a fast delete step applies to, using
+    nested subqueries rather than loading any IDs.
+
+    :param queryset: The QuerySet of objects being deleted
+    :param chain: A list of `(model, foreign_key)` hops, as returned by `_get_fast_delete_plan`
+    :return: A QuerySet of the affected related rows
+    """
+
+    for model, field in chain:
+        queryset = model._base_manager.using(queryset.db).filter(
+            **{
+                "{}__in".format(field.name): queryset.values(
+                    field.target_field.attname
+                )
+            }
+        )
+    return queryset
+
+
+def _parallel_map_init(app_name=None):
+
+    """
+    Initializes a `parallel_map` worker process with a fresh database connection. If an `app_name` is provided, the
+    Django application is (re)loaded with `reset_django_connection`, which is required when worker processes are
+    spawned rather than forked.
+
+    :param app_name: Optional name of the Django application to load in the worker
+    """
+
+    if app_name:
+        reset_django_connection(app_name)
+    else:
+        connections.close_all()
+
+
+def _parallel_map_worker(task):
+
+    """
+    Runs a `parallel_map` function over one partition of a QuerySet in a worker process. The QuerySet is rebuilt from
+    its model label and pickled query, then restricted to either a primary key range or a list of primary keys.
+
+    :param task: A tuple of `(model_label, db, query, func, start, end, pks)`
+    :return: A tuple of two dictionaries, mapping primary keys to results and to error tracebacks, respectively
+    """
+
+    model_label, db, query, func, start, end, pks = task
+    queryset = models.QuerySet(model=apps.get_model(model_label), query=query, using=db)
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    else:
+        queryset = queryset.filter(pk__gte=start, pk__lt=end)
+    results = {}
+    errors = {}
+    for obj in queryset.iterator():
+        try:
+            results[obj.pk] = func(obj)
+        except Exception:
+            errors[obj.pk] = traceback.format_exc()
+    return results, errors
+
+
+class TfidfIndex(object):
+
+    """
+    A reusable TF-IDF index over one or more text fields in a QuerySet, for running many `tfidf_similarities` searches
+    without refitting the vectorizer each time. The index holds the fitted vectorizer, a sparse matrix with a
+    normalized TF-IDF vector for each row, and an array of the rows' primary keys; a search is a single sparse dot
+    product. Indices can be saved to and loaded from disk, and rows that have been added or changed since the index
+    was built can be refreshed without refitting the vocabulary. Usually created with
+    `BasicExtendedManager.tfidf_index`.
+
+    :param queryset: The QuerySet to index
+    :param field_names: The names of the text fields to index (their values are concatenated, as in
+    `tfidf_similarities`)
+    :param vectorizer_kwargs: Additional arguments to pass to scikit-learn's `TfidfVectorizer`
+    """
+
+    def __init__(self, queryset, field_names, **vectorizer_kwargs):
+        self.model_label = queryset.model._meta.label
+        self.field_names = list(field_names)
+        self.vectorizer = TfidfVectorizer(decode_error="ignore", **vectorizer_kwargs)
+        self.pks = numpy.array([])
+        self.tfidf = None
+        self.refresh(queryset)
+
+    def __len__(self):
+        return len(self.pks)
+
+    def query(self, text, top_k=10, min_similarity=None, pks=None):
+
+        """
+        Computes the cosine similarities between some text and the rows in the index.
+
+        :param text: A string of text to compare
+        :param top_k: The maximum number of results to return; if None, every row is returned
+        :param min_similarity: The minimum similarity allowed for a result to be returned.
+        :param pks: Optional list of primary keys to restrict the results to
+        :return: A list of results with the primary keys of the most similar rows and their TF-IDF similarities,
+        sorted from most to least similar
+        """
+
+        if self.tfidf is None:
+            return []
+        vector = normalize(self.vectorizer.transform([text]))
+        similarities = (self.tfidf @ vector.T).toarray().ravel()
+        indices = numpy.arange(len(similarities))
+        if pks is not None:
+            indices = indices[
+                numpy.isin(self.pks, numpy.asarray(list(pks), dtype=self.pks.dtype))
+            ]
+        if min_similarity:
+            indices = indices[similarities[indices] >= min_similarity]
+        if top_k and len(indices) > top_k:
+            indices = indices[
+                numpy.argpartition(-similarities[indices], top_k - 1)[:top_k]
+            ]
+        indices = indices[numpy.argsort(-similarities[indices], kind="stable")]
+        return [
+            {"pk": self.pks[i].item(), "similarity": float(similarities[i])}
+            for i in indices
+        ]
+
+    def refresh(self, queryset):
+
+        """
+        Updates the index with the current values of the rows in a QuerySet; rows that are already in the index are
+        replaced, and new rows are added. The vocabulary and IDF weights aren't refitted, so words that weren't seen
+        when the index was built are ignored; if the underlying text has changed substantially, build a new index.
+        (If the index was built from an empty QuerySet, the vectorizer is fitted to the first rows that are added.)
+
+        :param queryset: A QuerySet of the rows that have been added or changed
+        """
+
+        pks, texts = self._load(queryset)
+        if not len(pks):
+            return
+        if self.tfidf is None:
+            self.pks = pks
+            self.tfidf = normalize(self.vectorizer.fit_transform(texts)).tocsr()
+            return
+        self.remove(pks)
+        self.pks = numpy.concatenate([self.pks, pks])
+        self.tfidf = sparse.vstack(
+            [self.tfidf, normalize(self.vectorizer.transform(texts))], format="csr"
+        )
+
+    def remove(self, pks):
+
+        """
+        Removes rows from the index.
+
+        :param pks: A list of primary keys
+        """
+
+        if self.tfidf is None:
+            return
+        keep = ~numpy.isin(self.pks, numpy.asarray(list(pks), dtype=self.pks.dtype))
+        if not keep.all():
+            self.pks = self.pks[keep]
+            self.tfidf = self.tfidf[keep]
+
+    def save(self, path):
+
+        """
+        Saves the index to a file.
+
+        :param path: The path to save the index to
+        """
+
+        with open(path, "wb") as output:
+            pickle.dump(self, output, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+
+        """
+        Loads an index that was saved with `save`.
+
+        :param path: The path to the saved index
+        :return: A `TfidfIndex`
+        """
+
+        with open(path, "rb") as handle:
+            return pickle.load(handle)
+
+    def _load(self, queryset):
+        if queryset.model._meta.label != self.model_label:
+            raise ValueError(
+                "This index is for {}, not {}".format(
+                    self.model_label, queryset.model._meta.label
+                )
+            )
+        rows = list(queryset.values_list("pk", *self.field_names))
+        pks = numpy.array([row[0] for row in rows])
+        texts = [" ".join(value or "" for value in row[1:]) for row in rows]
+        return pks, texts
+
+
 class BasicExtendedManager(models.QuerySet):
 
     """
@@ -198,22 +1395,209 @@ class BasicExtendedManager(models.QuerySet):
         self.functions = {}
         self.default_function = None
 
-    def to_df(self):
+    def to_df(self, copy=False, chunksize=None, typed=False):
 
         """
         Returns the QuerySet as a Pandas DataFrame, reading directly from the table in SQL.
 
-        :return: A Pandas DataFrame of the QuerySet objects.
+        :param copy: If True, the results are exported with Postgres' `COPY (query) TO STDOUT` in CSV format and
+        streamed through a temporary file into Pandas, rather than fetching them all into Python as row tuples first,
+        which roughly halves peak memory for large QuerySets. Note that column types are then inferred from the CSV
+        by Pandas (e.g. arrays come back as strings in Postgres' `{a,b}` format) unless `typed` is True. Ignored on
+        other databases.
+        :param chunksize: If provided, returns an iterator that yields DataFrames of (at most) this many rows at a
+        time instead of a single DataFrame. Without `copy`, rows are streamed from a server-side cursor.
+        :param typed: If True, column dtypes are derived from the model's fields instead of being guessed by Pandas:
+        integers use nullable extension dtypes instead of floats, booleans use the nullable `boolean` dtype,
+        CharFields with `choices` become categoricals, and dates and datetimes are parsed into `datetime64` columns.
+        This can substantially reduce memory usage for wide tables.
+        :return: A Pandas DataFrame of the QuerySet objects (or an iterator of DataFrames if `chunksize` is set).
         """
 
         try:
             query, params = self.query.sql_with_params()
         except EmptyResultSet:
+            if chunksize:
+                return iter([])
             return pandas.DataFrame()
 
-        return pandas.io.sql.read_sql_query(query, connection, params=params)
+        if copy and connections[self.db].vendor == "postgresql":
+            buffer = self._copy_to_file(query, params)
+            if chunksize:
+                results = self._read_csv_chunks(buffer, chunksize)
+            else:
+                with buffer:
+                    results = pandas.read_csv(buffer)
+        elif chunksize:
+            results = self._read_sql_chunks(query, params, chunksize)
+        else:
+            results = pandas.io.sql.read_sql_query(query, connection, params=params)
+
+        if typed:
+            if chunksize:
+                return (_apply_model_dtypes(df, self.model) for df in results)
+            return _apply_model_dtypes(results, self.model)
+        return results
+
+    def _copy_to_file(self, query, params):
 
-    def chunk(self, size=100, tqdm_desc=None, randomize=False):
+        """
+        Exports the results of a query to a temporary CSV file using Postgres' `COPY TO STDOUT`.
+
+        :param query: The SQL query
+        :param params: The query parameters
+        :return: An open temporary file, positioned at the start
+        """
+
+        buffer = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        with connections[self.db].cursor() as cursor:
+            query = cursor.mogrify(query, params).decode()
+            cursor.copy_expert(
+                "COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER)".format(query), buffer
+            )
+        buffer.seek(0)
+        return buffer
+
+    def _read_csv_chunks(self, buffer, chunksize):
+
+        """
+        Reads a CSV file into DataFrames of `chunksize` rows, closing the file when finished.
+
+        :param buffer: An open file
+        :param chunksize: The number of rows in each DataFrame
+        :return: An iterator of DataFrames
+        """
+
+        with buffer:
+            for df in pandas.read_csv(buffer, chunksize=chunksize):
+                yield df
+
+    def _read_sql_chunks(self, query, params, chunksize):
+
+        """
+        Runs a query on a server-side cursor and yields the results as DataFrames of `chunksize` rows.
+
+        :param query: The SQL query
+        :param params: The query parameters
+        :param chunksize: The number of rows in each DataFrame
+        :return: An iterator of DataFrames
+        """
+
+        cursor = connections[self.db].chunked_cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                columns = [column[0] for column in cursor.description]
+                yield pandas.DataFrame.from_records(rows, columns=columns)
+        finally:
+            cursor.close()
+
+    def _arrow_batches(self, field_names=None, batch_size=10000):
+
+        """
+        Streams the QuerySet from a server-side cursor as Apache Arrow record batches, with column types mapped from
+        the model's fields via `_get_arrow_type`.
+
+        :param field_names: Optional list of fields to include (defaults to all concrete fields)
+        :param batch_size: The number of rows in each batch
+        :return: A tuple of the Arrow schema and an iterator of record batches
+        """
+
+        import pyarrow
+
+        if field_names:
+            fields = [_get_lookup_field(self.model, f) for f in field_names]
+        else:
+            fields = list(self.model._meta.concrete_fields)
+        types = [_get_arrow_type(f) for f in fields]
+        schema = pyarrow.schema(
+            [
+                pyarrow.field(f.column, arrow_type, nullable=f.null)
+                for f, (arrow_type, _) in zip(fields, types)
+            ]
+        )
+
+        def batches():
+            rows = self.values_list(*[f.attname for f in fields]).iterator(
+                chunk_size=batch_size
+            )
+            for chunk in _chunk_iterable(rows, batch_size):
+                arrays = []
+                for values, (arrow_type, converter) in zip(zip(*chunk), types):
+                    if converter:
+                        values = [None if v is None else converter(v) for v in values]
+                    arrays.append(pyarrow.array(values, type=arrow_type))
+                yield pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+        return schema, batches()
+
+    def to_arrow(self, field_names=None, batch_size=10000):
+
+        """
+        Returns the QuerySet as an Apache Arrow table (requires `pyarrow`). Rows are streamed from a server-side
+        cursor in batches, and column types are mapped from the model's fields rather than inferred from the data:
+        relations take the type of their primary keys, ArrayFields become list columns, JSONFields are serialized to
+        strings and datetimes keep their time zones.
+
+        :param field_names: Optional list of fields to include (defaults to all concrete fields)
+        :param batch_size: The number of rows to fetch from the database at a time
+        :return: A `pyarrow.Table`
+        """
+
+        import pyarrow
+
+        schema, batches = self._arrow_batches(
+            field_names=field_names, batch_size=batch_size
+        )
+        return pyarrow.Table.from_batches(list(batches), schema=schema)
+
+    def to_parquet(
+        self, path, field_names=None, row_group_size=100000, compression="snappy"
+    ):
+
+        """
+        Writes the QuerySet to a Parquet file (requires `pyarrow`), streaming rows from a server-side cursor and
+        writing them one row group at a time, so the full QuerySet is never held in memory. Column types are mapped
+        from the model's fields, the same way as `to_arrow`.
+
+        :param path: The path of the file to write
+        :param field_names: Optional list of fields to include (defaults to all concrete fields)
+        :param row_group_size: The number of rows in each row group (also the number fetched at a time)
+        :param compression: The compression codec to use
+        :return: The number of rows written
+        """
+
+        import pyarrow
+        import pyarrow.parquet
+
+        schema, batches = self._arrow_batches(
+            field_names=field_names, batch_size=row_group_size
+        )
+        count = 0
+        with pyarrow.parquet.ParquetWriter(
+            path, schema, compression=compression
+        ) as writer:
+            for batch in batches:
+                writer.write_table(
+                    pyarrow.Table.from_batches([batch], schema=schema),
+                    row_group_size=row_group_size,
+                )
+                count += batch.num_rows
+
+        return count
+
+    def chunk(
+        self,
+        size=100,
+        tqdm_desc=None,
+        randomize=False,
+        keyset=False,
+        server_side_cursor=False,
+        seed=None,
+    ):
 
         """
         Helps save memory by iterating over the primary keys of objects in a QuerySet and yielding the results in
@@ -222,72 +1606,783 @@ class BasicExtendedManager(models.QuerySet):
         :param size: The number of objects to load in each chunk. Larger values will be more efficient but require
         more memory.
         :param tqdm_desc: Optional description to use in the progress bar while looping over the QuerySet.
-        :param randomize: Whether or not to randomly sort the objects in the QuerySet.
+        :param randomize: Whether or not to randomly sort the objects in the QuerySet. The random order is streamed
+        without loading every primary key up front (see `_random_pk_chunks`).
+        :param keyset: If True, pages through the QuerySet in primary key order (`WHERE pk > last_pk ORDER BY pk
+        LIMIT size`) instead of loading every primary key up front, so memory use is bounded by `size` rather than
+        the size of the table. The progress bar uses the query planner's row estimate rather than a full count.
+        Ignored if `randomize` is True. A sliced QuerySet can't be reordered, so it's loaded in full (as bounded by the
+        slice) and returned in its own order.
+        :param server_side_cursor: If True, streams the primary keys from a single server-side (named) cursor,
+        `size` at a time, rather than loading them all up front. Ignored if `randomize` is True.
+        :param seed: Optional seed to make the random order reproducible when `randomize` is True.
         :return: An iterable that yields each object in the QuerySet.
         """
 
-        ids = self.values_list("pk", flat=True)
-        if randomize:
-            ids = list(ids)
-            random.shuffle(ids)
-        if tqdm_desc:
-            iterator = tqdm(chunk_list(ids, size), desc=tqdm_desc, disable=os.environ.get("DISABLE_TQDM", False))
-        else:
-            iterator = chunk_list(ids, size)
-        for chunk in iterator:
-            for obj in self.model.objects.filter(pk__in=chunk):
-                yield obj
+        if keyset and not randomize:
+            batches = self._keyset_batches(size)
+            if tqdm_desc:
+                batches = self._tqdm_chunks(batches, size, tqdm_desc, True)
+            for batch in batches:
+                for obj in batch:
+                    yield obj
+            return
+
+        if randomize:
+            iterator = self._random_pk_chunks(size, seed=seed)
+            if tqdm_desc:
+                iterator = self._tqdm_chunks(iterator, size, tqdm_desc, True)
+            for chunk in iterator:
+                objs = self.model.objects.in_bulk(chunk)
+                for pk in chunk:
+                    if pk in objs:
+                        yield objs[pk]
+            return
+
+        iterator = self._pk_chunks(size, server_side_cursor=server_side_cursor)
+        if tqdm_desc:
+            iterator = self._tqdm_chunks(iterator, size, tqdm_desc, server_side_cursor)
+        for chunk in iterator:
+            for obj in self.model.objects.filter(pk__in=chunk):
+                yield obj
+
+    def _random_pk_chunks(self, size, seed=None):
+
+        """
+        Yields lists of primary keys from the QuerySet in a random order, `size` at a time, without loading all of
+        the primary keys into memory. For integer primary keys, the key range is split into blocks that each hold
+        roughly `size` objects (based on the query planner's row estimate); the blocks are visited in a random order
+        and the keys within each block are shuffled. This only requires one indexed range query per block, but
+        objects with nearby keys will tend to be returned near each other. At most `size * 10` keys are loaded from a
+        block at a time, so that a stale row estimate can't cause the whole table to be loaded at once; if a block
+        holds more keys than that, the rest of it is put back in a random position to be visited later. For other
+        primary keys, the QuerySet is
+        instead paged through in the order of a seeded MD5 hash of each key, which gives every object an independent
+        random position at the cost of sorting the QuerySet for each page.
+
+        :param size: The number of primary keys in each chunk
+        :param seed: Optional seed to make the order reproducible
+        :return: An iterable that yields lists of primary keys
+        """
+
+        rng = random.Random(seed)
+        if _has_integer_pk(self.model):
+            blocks = self._pk_blocks(size)
+            rng.shuffle(blocks)
+            max_block_size = size * 10
+            while blocks:
+                start, end = blocks.pop()
+                ids = list(
+                    self.filter(pk__gte=start, pk__lt=end)
+                    .order_by("pk")
+                    .values_list("pk", flat=True)[:max_block_size]
+                )
+                if len(ids) == max_block_size:
+                    blocks.insert(rng.randint(0, len(blocks)), (ids[-1] + 1, end))
+                rng.shuffle(ids)
+                for chunk in chunk_list(ids, size):
+                    yield chunk
+        else:
+            salt = Value(str(rng.random()))
+            queryset = (
+                self.annotate(
+                    _random_order=MD5(Concat(Cast("pk", models.TextField()), salt))
+                )
+                .order_by("_random_order", "pk")
+                .values_list("_random_order", "pk")
+            )
+            last = None
+            while True:
+                page = queryset
+                if last:
+                    page = queryset.filter(
+                        Q(_random_order__gt=last[0])
+                        | Q(_random_order=last[0], pk__gt=last[1])
+                    )
+                rows = list(page[:size])
+                if not rows:
+                    break
+                yield [pk for _, pk in rows]
+                if len(rows) < size:
+                    break
+                last = rows[-1]
+
+    def _pk_chunks(self, size, server_side_cursor=False):
+
+        """
+        Yields lists of primary keys from the QuerySet, `size` at a time. By default, all of the primary keys are
+        loaded up front. If `server_side_cursor` is True, they're instead streamed from a single named cursor, so the
+        query is only planned once and memory use is bounded by `size`. Django opens the cursor `WITH HOLD` when
+        running in autocommit mode, so this works both inside and outside of a transaction. On backends other than
+        Postgres, the keys are fetched `size` at a time from a regular cursor instead.
+
+        :param size: The number of primary keys in each chunk
+        :param server_side_cursor: Whether or not to stream the primary keys from a server-side cursor
+        :return: An iterable that yields lists of primary keys
+        """
+
+        ids = self.values_list("pk", flat=True)
+        if not server_side_cursor:
+            for chunk in chunk_list(ids, size):
+                yield chunk
+        else:
+            for chunk in _chunk_iterable(ids.iterator(chunk_size=size), size):
+                yield chunk
+
+    def _tqdm_chunks(self, iterator, size, tqdm_desc, estimate_total=False):
+
+        """
+        Wraps an iterable of chunks in a progress bar. If `estimate_total` is True, the total number of chunks is
+        estimated from the query planner, since streamed iterators can't report their own length.
+
+        :param iterator: An iterable of chunks
+        :param size: The size of each chunk
+        :param tqdm_desc: Description for the progress bar
+        :param estimate_total: Whether or not to give the progress bar an estimated total
+        :return: The wrapped iterable
+        """
+
+        total = None
+        if estimate_total:
+            total = int(math.ceil(_estimated_count(self) / float(size)))
+        return tqdm(
+            iterator,
+            desc=tqdm_desc,
+            total=total,
+            disable=os.environ.get("DISABLE_TQDM", False),
+        )
+
+    def _pk_blocks(self, size):
+
+        """
+        Splits the range between the QuerySet's minimum and maximum integer primary keys into consecutive blocks
+        that are each expected to contain about `size` objects, based on the query planner's row estimate (and that
+        are never narrower than `size`). If the table's statistics are stale, blocks may hold many more objects than
+        expected, so callers shouldn't load a whole block into memory at once.
+
+        :param size: The approximate number of objects in each block
+        :return: A list of `(start, end)` tuples, where `start` is inclusive and `end` is exclusive
+        """
+
+        bounds = self.aggregate(min_pk=Min("pk"), max_pk=Max("pk"))
+        if bounds["min_pk"] is None:
+            return []
+        span = bounds["max_pk"] - bounds["min_pk"] + 1
+        estimate = max(_estimated_count(self), 1)
+        width = max(size, int(math.ceil(size * span / float(estimate))))
+        return [
+            (start, start + width)
+            for start in range(bounds["min_pk"], bounds["max_pk"] + 1, width)
+        ]
+
+    def _keyset_batches(self, size):
+
+        """
+        Yields lists of objects from the QuerySet, `size` at a time, by seeking past the last primary key of the
+        previous batch. The QuerySet's own filters, annotations and `select_related` are preserved; results are
+        ordered by primary key. For `values()` and `values_list()` QuerySets, whose rows may not include the primary
+        key, each page of primary keys is fetched first and the rows are then loaded for that page. Sliced QuerySets
+        can't be filtered or reordered, so they're loaded in a single query (which the slice already bounds) and split
+        into batches in their own order.
+
+        :param size: The number of objects to load in each batch
+        :return: An iterable that yields lists of objects (or rows)
+        """
+
+        if self.query.is_sliced:
+            for batch in chunk_list(list(self), size):
+                yield batch
+            return
+
+        queryset = self.order_by("pk")
+        is_model_queryset = issubclass(self._iterable_class, ModelIterable)
+        last_pk = None
+        while True:
+            page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            if is_model_queryset:
+                batch = list(page[:size])
+                pks = batch
+            else:
+                pks = list(page.values_list("pk", flat=True)[:size])
+                batch = list(queryset.filter(pk__in=pks)) if pks else []
+            if not batch:
+                break
+            yield batch
+            if len(pks) < size:
+                break
+            last_pk = pks[-1].pk if is_model_queryset else pks[-1]
+
+    def parallel_map(
+        self, func, size=1000, workers=None, tqdm_desc=None, app_name=None
+    ):
+
+        """
+        Applies a function to every object in the QuerySet using a pool of worker processes, so CPU-heavy work can
+        make use of all of the cores on a machine. The QuerySet is partitioned into primary key ranges that each hold
+        about `size` objects (or, for non-integer primary keys, into lists of `size` primary keys, which are all
+        loaded before the workers start), and each partition is loaded and processed by a worker with its own database connection.
+        Database connections in the calling process are closed before the pool is started, so they aren't shared with
+        the workers; as a result, this can't be called inside of a transaction.
+
+        The function, and the values it returns, must be picklable (e.g. defined at the top level of a module).
+        Exceptions raised by the function are caught and returned rather than stopping the other workers.
+
+        :param func: A function that takes a single model object
+        :param size: The approximate number of objects in each partition
+        :param workers: The number of worker processes (defaults to the number of CPUs). If 1, the objects are
+        processed in the current process, which can be useful for debugging.
+        :param tqdm_desc: Optional description for the progress bar, which tracks completed partitions
+        :param app_name: Optional name of the Django application to load in each worker via `reset_django_connection`;
+        this is required if the `multiprocessing` start method is `spawn` (the default on Windows and macOS)
+        :return: A tuple of two dictionaries: the first maps primary keys to the values returned by `func`, and the
+        second maps primary keys to the tracebacks of any exceptions that were raised
+        """
+
+        if not workers:
+            workers = multiprocessing.cpu_count()
+        model_label = self.model._meta.label
+        if _has_integer_pk(self.model):
+            tasks = [
+                (model_label, self.db, self.query, func, start, end, None)
+                for start, end in self._pk_blocks(size)
+            ]
+            total = len(tasks)
+        else:
+            # the partitions are built up front, so the cursor is closed before the connections are
+            tasks = [
+                (model_label, self.db, self.query, func, None, None, pks)
+                for pks in self._pk_chunks(size, server_side_cursor=True)
+            ]
+            total = len(tasks)
+
+        results = {}
+        errors = {}
+        if workers == 1:
+            iterator = (_parallel_map_worker(task) for task in tasks)
+            pool = None
+        else:
+            if connections[self.db].in_atomic_block:
+                raise Exception("parallel_map can't be run inside of a transaction")
+            connections.close_all()
+            pool = multiprocessing.Pool(
+                workers, initializer=_parallel_map_init, initargs=(app_name,)
+            )
+            iterator = pool.imap_unordered(_parallel_map_worker, tasks)
+        try:
+            if tqdm_desc:
+                iterator = tqdm(
+                    iterator,
+                    desc=tqdm_desc,
+                    total=total,
+                    disable=os.environ.get("DISABLE_TQDM", False),
+                )
+            for chunk_results, chunk_errors in iterator:
+                results.update(chunk_results)
+                errors.update(chunk_errors)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        return results, errors
+
+    def chunk_threaded(
+        self, func, size=100, workers=8, prefetch=2, tqdm_desc=None
+    ):
+
+        """
+        Applies a function to every object in the QuerySet using a pool of threads, which is well-suited to I/O-bound
+        work (e.g. HTTP requests or file reads) where a process pool would be overkill. Objects are loaded in batches
+        of `size` (paging through the QuerySet by primary key, as with `chunk(keyset=True)`) in the calling thread
+        and placed on a bounded queue, so the next batches are fetched from the database while the worker threads
+        process the current ones, and fetching pauses whenever the queue is full. Worker threads that use the database
+        get their own connections, which are closed when they finish.
+
+        Exceptions raised by the function are caught and returned rather than stopping the other workers.
+
+        :param func: A function that takes a single model object
+        :param size: The number of objects in each batch
+        :param workers: The number of worker threads
+        :param prefetch: The maximum number of batches that can be waiting in the queue
+        :param tqdm_desc: Optional description for the progress bar, which tracks processed objects
+        :return: A tuple of three dictionaries: the first maps primary keys to the values returned by `func`, the
+        second maps primary keys to the tracebacks of any exceptions that were raised, and the third contains
+        throughput metrics to help tune `size`, `workers` and `prefetch`:
+            - `objects`: The number of objects processed
+            - `batches`: The number of batches processed
+            - `seconds`: The total elapsed time
+            - `objects_per_second`: The overall throughput
+            - `max_queue_depth`/`mean_queue_depth`: The number of batches waiting in the queue, measured each time \
+            a batch is added. If the queue is usually full, the workers are the bottleneck; if it's usually empty, \
+            the database is.
+            - `fetch_wait_seconds`: Time spent waiting for space in the queue after fetching a batch
+            - `worker_wait_seconds`: Total time the workers spent waiting for a batch to be fetched
+        """
+
+        batches = queue.Queue(maxsize=max(prefetch, 1))
+        results = {}
+        errors = {}
+        lock = threading.Lock()
+        metrics = {
+            "objects": 0,
+            "batches": 0,
+            "fetch_wait_seconds": 0.0,
+            "worker_wait_seconds": 0.0,
+        }
+        progress = None
+        if tqdm_desc:
+            progress = tqdm(
+                desc=tqdm_desc,
+                total=_estimated_count(self),
+                disable=os.environ.get("DISABLE_TQDM", False),
+            )
+
+        def work():
+            try:
+                while True:
+                    start = time.time()
+                    batch = batches.get()
+                    with lock:
+                        metrics["worker_wait_seconds"] += time.time() - start
+                    if batch is None:
+                        break
+                    for obj in batch:
+                        try:
+                            results[obj.pk] = func(obj)
+                        except Exception:
+                            errors[obj.pk] = traceback.format_exc()
+                    with lock:
+                        metrics["objects"] += len(batch)
+                        metrics["batches"] += 1
+                        if progress:
+                            progress.update(len(batch))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=work) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        depths = []
+        started = time.time()
+        try:
+            for batch in self._keyset_batches(size):
+                depths.append(batches.qsize())
+                start = time.time()
+                batches.put(batch)
+                metrics["fetch_wait_seconds"] += time.time() - start
+        finally:
+            for _ in threads:
+                batches.put(None)
+            for thread in threads:
+                thread.join()
+            if progress:
+                progress.close()
+
+        metrics["seconds"] = time.time() - started
+        metrics["objects_per_second"] = (
+            metrics["objects"] / metrics["seconds"] if metrics["seconds"] else 0.0
+        )
+        metrics["max_queue_depth"] = max(depths) if depths else 0
+        metrics["mean_queue_depth"] = (
+            sum(depths) / float(len(depths)) if depths else 0.0
+        )
+
+        return results, errors, metrics
+
+    def sample(self, size, method=None, seed=None, stratify_by=None):
+
+        """
+        Draws a random sample from a QuerySet, without loading all of its primary keys into memory.
+
+        :param size: The size of the sample
+        :param method: The sampling strategy to use. By default, `pk_range` is used for unfiltered QuerySets with
+        integer primary keys, and `reservoir` for everything else.
+            - `reservoir`: streams the primary keys from a server-side cursor and keeps a uniform random \
+            sample of `size` of them in memory. Works for any QuerySet, and makes a single pass over it; memory use \
+            is bounded by `size`, but every primary key in the QuerySet is still read, so the time it takes grows \
+            with the size of the QuerySet.
+            - `system` / `bernoulli`: uses Postgres' `TABLESAMPLE SYSTEM` (random pages) or `TABLESAMPLE BERNOULLI` \
+            (random rows) to read only a fraction of the table, sized from the query planner's row estimate and \
+            doubled until enough rows are found. `system` is the fastest but samples whole pages at a time, so \
+            rows stored together are more likely to be drawn together. Falls back to `reservoir` on other databases.
+            - `pk_range`: draws random values between the QuerySet's minimum and maximum primary keys and keeps the \
+            ones that exist. This is very fast for dense integer keys, and falls back to `reservoir` for non-integer \
+            keys or when too few of the drawn keys exist.
+        :param seed: Optional seed for the random number generator, to make the sample reproducible
+        :param stratify_by: Optional field name; if provided, the sample is drawn separately within each value of the \
+        field, with `size` allocated proportionally to the number of objects with each value
+        :return: A QuerySet representing the sampled objects
+        """
+
+        rng = random.Random(seed)
+        if stratify_by:
+            sample = self._stratified_sample(size, method, rng, stratify_by)
+        else:
+            sample = self._sample_pks(size, method, rng)
+
+        return self.model.objects.filter(pk__in=sample)
+
+    def _sample_pks(self, size, method, rng):
+
+        """
+        Draws a random sample of primary keys from the QuerySet using the specified method (see `sample`).
+
+        :param size: The size of the sample
+        :param method: The sampling method
+        :param rng: A `random.Random` instance
+        :return: A list of primary keys
+        """
+
+        if method is None:
+            if _has_integer_pk(self.model) and not self.query.where:
+                method = "pk_range"
+            else:
+                method = "reservoir"
+        if method == "reservoir":
+            return self._reservoir_sample(size, rng)
+        elif method in ("system", "bernoulli"):
+            return self._tablesample_sample(size, rng, method)
+        elif method == "pk_range":
+            return self._pk_range_sample(size, rng)
+        raise Exception("Unknown sampling method: {}".format(method))
+
+    def _reservoir_sample(self, size, rng):
+
+        """
+        Draws a uniform random sample of primary keys by streaming them through a reservoir.
+
+        :param size: The size of the sample
+        :param rng: A `random.Random` instance
+        :return: A list of primary keys
+        """
+
+        sample = []
+        ids = self.values_list("pk", flat=True).iterator(chunk_size=10000)
+        for i, pk in enumerate(ids):
+            if i < size:
+                sample.append(pk)
+            else:
+                j = rng.randint(0, i)
+                if j < size:
+                    sample[j] = pk
+        return sample
+
+    def _tablesample_sample(self, size, rng, method):
+
+        """
+        Draws a random sample of primary keys using Postgres' `TABLESAMPLE`. The sampling percentage starts from the
+        query planner's estimate of how many rows the QuerySet contains, and is doubled until at least `size` rows
+        are found; any extra rows are then discarded at random.
+
+        :param size: The size of the sample
+        :param rng: A `random.Random` instance
+        :param method: Either `system` or `bernoulli`
+        :return: A list of primary keys
+        """
 
-    def sample(self, size):
+        if connections[self.db].vendor != "postgresql":
+            return self._reservoir_sample(size, rng)
+
+        if size <= 0:
+            return []
+        estimate = max(_estimated_count(self), 1)
+        percent = min(100.0, 150.0 * size / estimate)
+        quote_name = connections[self.db].ops.quote_name
+        query = "SELECT {} FROM {} TABLESAMPLE {} (%s) REPEATABLE (%s)".format(
+            quote_name(self.model._meta.pk.column),
+            quote_name(self.model._meta.db_table),
+            method.upper(),
+        )
+        while True:
+            tablesample = RawSQL(query, (percent, rng.randint(0, 2 ** 31 - 1)))
+            ids = list(self.filter(pk__in=tablesample).values_list("pk", flat=True))
+            if len(ids) >= size or percent >= 100:
+                break
+            percent = min(100.0, percent * 2)
+        if len(ids) > size:
+            ids = rng.sample(ids, size)
+        return ids
+
+    def _pk_range_sample(self, size, rng, max_rounds=10):
 
         """
-        Draws a random sample from a QuerySet.
+        Draws a random sample of primary keys by probing random values between the QuerySet's minimum and maximum
+        integer primary keys. Each existing key is equally likely to be drawn, so the sample is uniform. Falls back
+        to reservoir sampling if the primary key isn't an integer, or if the keys are too sparse to fill the sample
+        within `max_rounds` rounds of probing.
 
         :param size: The size of the sample
-        :return: A QuerySet representing the sampled objects
+        :param rng: A `random.Random` instance
+        :param max_rounds: The maximum number of rounds of probing before falling back to reservoir sampling
+        :return: A list of primary keys
         """
 
-        ids = self.values_list("pk", flat=True)
-        ids = list(ids)
-        random.shuffle(ids)
-        sample = ids[:size]
+        if not _has_integer_pk(self.model) or size <= 0:
+            return self._reservoir_sample(size, rng)
+
+        bounds = self.aggregate(min_pk=Min("pk"), max_pk=Max("pk"))
+        if bounds["min_pk"] is None:
+            return []
+        keys = range(bounds["min_pk"], bounds["max_pk"] + 1)
+        density = min(1.0, max(_estimated_count(self), 1) / float(len(keys)))
+        sample = set()
+        tried = set()
+        for _ in range(max_rounds):
+            remaining = size - len(sample)
+            num = min(int(math.ceil(remaining * 1.5 / density)), len(keys) - len(tried))
+            if num <= 0:
+                break
+            candidates = [k for k in rng.sample(keys, num) if k not in tried]
+            tried.update(candidates)
+            for chunk in chunk_list(candidates, 10000):
+                sample.update(self.filter(pk__in=chunk).values_list("pk", flat=True))
+            if len(sample) >= size:
+                return rng.sample(sorted(sample), size)
+        if len(tried) >= len(keys):
+            return list(sample)
+        return self._reservoir_sample(size, rng)
+
+    def _stratified_sample(self, size, method, rng, stratify_by):
 
-        return self.model.objects.filter(pk__in=sample)
+        """
+        Draws a stratified random sample, splitting `size` across the values of a field in proportion to the number
+        of objects with each value (using the largest remainder method), and sampling each stratum separately.
+
+        :param size: The size of the sample
+        :param method: The sampling method to use within each stratum
+        :param rng: A `random.Random` instance
+        :param stratify_by: The name of the field to stratify by
+        :return: A list of primary keys
+        """
 
-    def chunk_update(self, size=100, tqdm_desc="Updating", **to_update):
+        counts = [
+            (row[stratify_by], row["count"])
+            for row in self.order_by()
+            .values(stratify_by)
+            .annotate(count=models.Count("pk"))
+            .order_by(stratify_by)
+        ]
+        total = sum(count for _, count in counts)
+        if total == 0:
+            return []
+        size = min(size, total)
+        quotas = [size * count / float(total) for _, count in counts]
+        allocation = [int(math.floor(q)) for q in quotas]
+        by_remainder = sorted(
+            range(len(counts)), key=lambda i: quotas[i] - allocation[i], reverse=True
+        )
+        for i in by_remainder[: size - sum(allocation)]:
+            allocation[i] += 1
+
+        sample = []
+        for (value, _), num in zip(counts, allocation):
+            if num == 0:
+                continue
+            if value is None:
+                stratum = self.filter(**{"{}__isnull".format(stratify_by): True})
+            else:
+                stratum = self.filter(**{stratify_by: value})
+            sample.extend(stratum._sample_pks(num, method, rng))
+        return sample
+
+    def chunk_update(
+        self,
+        size=100,
+        tqdm_desc="Updating",
+        server_side_cursor=False,
+        pk_ranges=False,
+        sleep=None,
+        **to_update
+    ):
 
         """
         Iterates over a QuerySet and applies an update to them in chunks rather than all at once, to save memory.
 
         :param size: The size of each chunk. Larger chunk sizes will be more efficient but cost more memory.
         :param tqdm_desc: Optional description for the progress bar
+        :param server_side_cursor: If True, streams the primary keys from a single server-side cursor rather than
+        loading them all up front
+        :param pk_ranges: If True, the update is applied directly in the database over primary key ranges of width
+        `size`, so no IDs are ever loaded into Python. Each range starts at the next existing primary key after the
+        previous one, so gaps in the keys are skipped. Each range is updated in its own transaction, so when called outside of a transaction, each batch is
+        committed as it completes. Requires an integer primary key.
+        :param sleep: Optional number of seconds to pause between batches, to throttle large backfills
         :param to_update: A dictionary of fields and values to update them to. Operates like Django's `update` function
         """
 
-        ids = self.values_list("pk", flat=True)
+        if pk_ranges:
+            if not _has_integer_pk(self.model):
+                raise Exception(
+                    "Ranged updates require an integer primary key; {} has a {}".format(
+                        self.model, self.model._meta.pk.get_internal_type()
+                    )
+                )
+            iterator = self._pk_range_starts(size)
+            if tqdm_desc:
+                iterator = self._tqdm_chunks(iterator, size, tqdm_desc, True)
+            for start in iterator:
+                with transaction.atomic(using=self.db):
+                    self.filter(pk__gte=start, pk__lt=start + size).update(**to_update)
+                if sleep:
+                    time.sleep(sleep)
+            lookup_cache.discard_model(self.model)
+            return
+
+        iterator = self._pk_chunks(size, server_side_cursor=server_side_cursor)
         if tqdm_desc:
-            iterator = tqdm(chunk_list(ids, size), desc=tqdm_desc, disable=os.environ.get("DISABLE_TQDM", False))
-        else:
-            iterator = chunk_list(ids, size)
+            iterator = self._tqdm_chunks(iterator, size, tqdm_desc, server_side_cursor)
         for chunk in iterator:
             self.model.objects.filter(pk__in=chunk).update(**to_update)
+            if sleep:
+                time.sleep(sleep)
+        lookup_cache.discard_model(self.model)
+
+    def _pk_range_starts(self, size):
+
+        """
+        Yields the starting points of consecutive integer primary key ranges of width `size` that cover the QuerySet.
+        Each range starts at the smallest primary key after the end of the previous one (found with an indexed
+        `MIN` query), so empty ranges between sparse keys are skipped.
 
-    def chunk_delete(self, size=100, tqdm_desc="Deleting"):
+        :param size: The width of each range
+        :return: An iterable of inclusive range starts
+        """
+
+        start = self.aggregate(min_pk=Min("pk"))["min_pk"]
+        while start is not None:
+            yield start
+            start = self.filter(pk__gte=start + size).aggregate(min_pk=Min("pk"))[
+                "min_pk"
+            ]
+
+    def chunk_delete(
+        self,
+        size=100,
+        tqdm_desc="Deleting",
+        server_side_cursor=False,
+        fast=False,
+        dry_run=False,
+    ):
 
         """
         Iterates over a QuerySet and deletes objects in chunks rather than all at once, to save memory.
 
         :param size: The size of each chunk. Larger chunk sizes will be more efficient but cost more memory.
         :param tqdm_desc: Optional description for the progress bar
+        :param server_side_cursor: If True, streams the primary keys from a single server-side cursor rather than
+        loading them all up front
+        :param fast: If True, the cascade graph is computed once from the model's relations and each chunk is deleted
+        with bulk `UPDATE`/`DELETE ... WHERE fk IN (subquery)` statements, rather than loading related objects into
+        memory via Django's `Collector`. No signals are sent. An exception is raised if the cascades can't be expressed
+        in SQL (e.g. there are delete signal receivers, generic relations or `PROTECT` constraints).
+        :param dry_run: If True, nothing is deleted; instead, returns a list of the statements that a fast delete
+        would run (in order) across the whole QuerySet, along with the number of rows each would affect
+        :return: If `dry_run` is True, a list of dictionaries describing the planned statements
         """
 
-        ids = self.values_list("pk", flat=True)
+        if fast or dry_run:
+            plan = _get_fast_delete_plan(self.model)
+            if dry_run:
+                report = []
+                for model, action, chain in plan:
+                    queryset = _get_fast_delete_queryset(self, chain)
+                    subquery = queryset.values("pk").query
+                    if action == "delete":
+                        statement = "DELETE FROM {} WHERE {} IN ({})".format(
+                            model._meta.db_table, model._meta.pk.column, subquery
+                        )
+                    else:
+                        statement = "UPDATE {} SET {} = NULL WHERE {} IN ({})".format(
+                            model._meta.db_table,
+                            chain[-1][1].column,
+                            model._meta.pk.column,
+                            subquery,
+                        )
+                    report.append(
+                        {
+                            "model": model,
+                            "action": action,
+                            "statement": statement,
+                            "count": queryset.count(),
+                        }
+                    )
+                return report
+
+        iterator = self._pk_chunks(size, server_side_cursor=server_side_cursor)
         if tqdm_desc:
-            iterator = tqdm(chunk_list(ids, size), desc=tqdm_desc, disable=os.environ.get("DISABLE_TQDM", False))
-        else:
-            iterator = chunk_list(ids, size)
+            iterator = self._tqdm_chunks(iterator, size, tqdm_desc, server_side_cursor)
         for chunk in iterator:
-            self.model.objects.filter(pk__in=chunk).delete()
+            if fast:
+                with transaction.atomic(using=self.db):
+                    batch = self.model._base_manager.using(self.db).filter(pk__in=chunk)
+                    for model, action, chain in plan:
+                        queryset = _get_fast_delete_queryset(batch, chain)
+                        if action == "delete":
+                            queryset._raw_delete(queryset.db)
+                        else:
+                            queryset.update(**{chain[-1][1].name: None})
+            else:
+                self.model.objects.filter(pk__in=chunk).delete()
+        if fast:
+            for model, _, _ in plan:
+                lookup_cache.discard_model(model)
+
+    async def achunk(self, size=100):
+
+        """
+        An asynchronous version of `chunk` for use under `asyncio`. Objects are loaded in batches of `size`, paging
+        through the QuerySet by primary key (as with `chunk(keyset=True)`), and each query is run in Django's
+        thread-sensitive executor via `sync_to_async`, so the event loop isn't blocked and the database connection is
+        used safely (without setting `DJANGO_ALLOW_ASYNC_UNSAFE`). The next batch is fetched in the background while
+        the objects in the current batch are being consumed.
+
+        Usage::
+
+            async for obj in MyModel.objects.filter(...).achunk(size=500):
+                await process(obj)
+
+        :param size: The number of objects to load in each batch
+        :return: An asynchronous iterable that yields each object in the QuerySet
+        """
+
+        batches = self._keyset_batches(size)
+        fetch = sync_to_async(next, thread_sensitive=True)
+        pending = asyncio.ensure_future(fetch(batches, None))
+        try:
+            while True:
+                batch = await pending
+                if batch is None:
+                    break
+                pending = asyncio.ensure_future(fetch(batches, None))
+                for obj in batch:
+                    yield obj
+        finally:
+            if not pending.done():
+                await pending
+
+    async def achunk_update(self, *args, **kwargs):
+
+        """
+        An asynchronous version of `chunk_update`, which runs the update in Django's thread-sensitive executor via
+        `sync_to_async` so it doesn't block the event loop. Accepts the same parameters as `chunk_update`.
+        """
+
+        return await sync_to_async(self.chunk_update, thread_sensitive=True)(
+            *args, **kwargs
+        )
+
+    async def achunk_delete(self, *args, **kwargs):
+
+        """
+        An asynchronous version of `chunk_delete`, which runs the deletion in Django's thread-sensitive executor via
+        `sync_to_async` so it doesn't block the event loop. Accepts the same parameters as `chunk_delete`.
+
+        :return: The return value of `chunk_delete`
+        """
+
+        return await sync_to_async(self.chunk_delete, thread_sensitive=True)(
+            *args, **kwargs
+        )
 
     def inspect_delete(self, counts=False):
 
@@ -309,6 +2404,7 @@ class BasicExtendedManager(models.QuerySet):
         empty_lists_are_null=True,
         allow_list_overlaps=False,
         logger=None,
+        use_cache=False,
     ):
 
         """
@@ -325,9 +2421,26 @@ class BasicExtendedManager(models.QuerySet):
         :param empty_lists_are_null: If True (default), it will treat empty lists the same as it does null values
         (otherwise it will treat them like non-nulls)
         :param logger: Optional logger for recording errors
+        :param use_cache: If True, the object is looked up in (and added to) `lookup_cache`, a per-process identity
+        map, so that repeated lookups for the same object skip the database (see `LookupCache`)
         :return: The object, if it was found successfully
         """
 
+        cache_key = None
+        if use_cache:
+            cache_key = _get_lookup_cache_key(
+                self,
+                unique_data,
+                match_any,
+                search_nulls,
+                empty_lists_are_null,
+                allow_list_overlaps,
+            )
+            if cache_key:
+                existing = lookup_cache.get(cache_key)
+                if existing is not None:
+                    return existing
+
         search_data = filter_field_dict(
             unique_data,
             drop_nulls=(not search_nulls),
@@ -345,16 +2458,14 @@ class BasicExtendedManager(models.QuerySet):
             existing = None
             try:
                 if match_any:
-                    query = Q()
-                    for field in list(search_data.keys()):
-                        query |= Q(**{field: search_data[field]})
-                    existing = self.filter(query).distinct()
-                    if existing.count() > 1:
+                    matches = self._match_any(search_data)
+                    if len(matches) > 1:
+                        existing = matches
                         raise self.model.MultipleObjectsReturned
-                    elif existing.count() == 0:
+                    elif len(matches) == 0:
                         raise self.model.DoesNotExist
                     else:
-                        existing = existing[0]
+                        existing = matches[0]
                 else:
                     existing = self.get(**search_data)
             except self.model.DoesNotExist:
@@ -378,8 +2489,152 @@ class BasicExtendedManager(models.QuerySet):
         else:
             existing = None
 
+        if cache_key and existing:
+            lookup_cache.set(cache_key, existing)
+
         return existing
 
+    def _match_any(self, search_data):
+
+        """
+        Fetches up to two objects that match ANY of the conditions in `search_data`, which is enough to tell whether
+        there are zero, one or multiple matches. If every field is individually indexed, the conditions are run as a
+        `UNION` of separate indexed lookups on the primary key (which Postgres often won't plan on its own for an
+        `OR` across columns), which the matching objects are selected from in the same query; otherwise, the
+        conditions are combined with `OR`. Either way, a single `LIMIT 2` query is run.
+
+        :param search_data: A dictionary of filter values
+        :return: A list of (at most two) matching objects
+        """
+
+        if len(search_data) > 1 and all(
+            _is_indexed(self.model, field) for field in search_data.keys()
+        ):
+            lookups = [
+                self.filter(**{field: value}).order_by().values("pk")
+                for field, value in search_data.items()
+            ]
+            return list(self.filter(pk__in=lookups[0].union(*lookups[1:]))[:2])
+
+        query = Q()
+        for field in list(search_data.keys()):
+            query |= Q(**{field: search_data[field]})
+        return list(self.filter(query).distinct()[:2])
+
+    def get_many_if_exists(
+        self,
+        list_of_unique_data,
+        match_any=False,
+        search_nulls=False,
+        empty_lists_are_null=True,
+        allow_list_overlaps=False,
+        batch_size=1000,
+        logger=None,
+    ):
+
+        """
+        A batched version of `get_if_exists` that looks up a list of `unique_data` dictionaries at once. Records are
+        grouped by the set of fields they search on, and each group is looked up with one query per `batch_size`
+        records (using an `IN` filter for single-field lookups, or a combined `OR` of the records' conditions
+        otherwise); the results are then matched back to the records in memory. Records that can't be matched on
+        exact field values (those that use `match_any`, `__` lookups, or list overlaps via `allow_list_overlaps`) are
+        looked up individually with `get_if_exists`.
+
+        :param list_of_unique_data: A list of dictionaries of filter values
+        :param match_any: If True, returns a match if ANY of the keys in a record select an object
+        :param search_nulls: If False (default), it will ignore unique_data keys with null values
+        :param empty_lists_are_null: If True (default), it will treat empty lists the same as it does null values
+        (otherwise it will treat them like non-nulls)
+        :param allow_list_overlaps: If True, list values will match any existing lists that they overlap with
+        :param batch_size: The maximum number of records to look up in each query
+        :param logger: Optional logger for recording errors
+        :return: A list containing the matching object (or None) for each record, in the same order as the records
+        """
+
+        results = [None] * len(list_of_unique_data)
+        shapes = {}
+        for i, unique_data in enumerate(list_of_unique_data):
+            search_data = filter_field_dict(
+                unique_data,
+                drop_nulls=(not search_nulls),
+                empty_lists_are_null=empty_lists_are_null,
+                drop_underscore_joins=False,
+            )
+            if not search_data:
+                continue
+            names = tuple(sorted(search_data.keys()))
+            try:
+                fields = tuple(_get_lookup_field(self.model, k) for k in names)
+            except FieldDoesNotExist:
+                fields = None
+            if (
+                match_any
+                or not fields
+                or (
+                    allow_list_overlaps
+                    and any(isinstance(v, list) for v in search_data.values())
+                )
+            ):
+                results[i] = self.get_if_exists(
+                    unique_data,
+                    match_any=match_any,
+                    search_nulls=search_nulls,
+                    empty_lists_are_null=empty_lists_are_null,
+                    allow_list_overlaps=allow_list_overlaps,
+                    logger=logger,
+                )
+                continue
+            key = tuple(
+                _normalize_lookup_value(field, search_data[name])
+                for name, field in zip(names, fields)
+            )
+            shape = shapes.setdefault((names, fields), ([], {}))
+            shape[0].append((i, key))
+            shape[1].setdefault(key, search_data)
+
+        for (names, fields), (records, searches) in shapes.items():
+            matches = {}
+            for batch in chunk_list(list(searches.keys()), batch_size):
+                if len(fields) == 1 and not isinstance(fields[0], ArrayField):
+                    values = [searches[key][names[0]] for key in batch]
+                    query = Q(
+                        **{
+                            "{}__in".format(names[0]): [
+                                v for v in values if v is not None
+                            ]
+                        }
+                    )
+                    if None in values:
+                        query |= Q(**{"{}__isnull".format(names[0]): True})
+                else:
+                    query = Q()
+                    for key in batch:
+                        query |= Q(**searches[key])
+                for obj in self.filter(query):
+                    key = tuple(
+                        _freeze_value(getattr(obj, field.attname)) for field in fields
+                    )
+                    matches.setdefault(key, []).append(obj)
+
+            for i, key in records:
+                objs = matches.get(key, [])
+                if len(objs) > 1:
+                    search_data = searches[key]
+                    if logger:
+                        logger.error(
+                            "%s get_many_if_exists query on %s returned multiple rows"
+                            % (str(search_data), str(self.model))
+                        )
+                    raise self.model.MultipleObjectsReturned(
+                        "Multiple {} objects match {}: {}".format(
+                            self.model.__name__, search_data, objs
+                        )
+                    )
+                elif objs:
+                    results[i] = objs[0]
+
+        return results
+
     def create_or_update(
         self,
         unique_data,
@@ -394,6 +2649,8 @@ class BasicExtendedManager(models.QuerySet):
         logger=None,
         command_log=None,
         force_create=False,
+        upsert=False,
+        use_cache=False,
         **save_kwargs
     ):
         """
@@ -425,9 +2682,52 @@ class BasicExtendedManager(models.QuerySet):
         many-to-many command/command_log fields, if it has them
         :param force_create: If True, this function will assume that the object does not exist and will skip the
         get_if_exists check
+        :param upsert: If True and the keys in `unique_data` match a unique constraint on the model, the object will
+        be created or updated with a single Postgres `INSERT ... ON CONFLICT DO UPDATE` statement rather than a
+        lookup followed by a save, which avoids extra round trips and races between concurrent writers. The model's
+        `save` method isn't called in this case. Falls back to the regular behavior if no matching constraint is
+        found, if `match_any` is True, or if the database isn't Postgres.
+        :param use_cache: If True, the object is looked up in (and added to) `lookup_cache`, a per-process identity
+        map, so that repeated calls for the same object skip the lookup query (see `LookupCache`)
         :return: The created or updated object
         """
 
+        cache_key = None
+        if use_cache:
+            # the lookup key has to be built up front, since unique_data gets modified in place when it's filtered
+            cache_key = _get_lookup_cache_key(
+                self,
+                unique_data,
+                match_any,
+                search_nulls,
+                empty_lists_are_null,
+                allow_list_overlaps,
+            )
+
+        if upsert and not match_any:
+            existing = _upsert_object(
+                self.model,
+                unique_data,
+                update_data=update_data,
+                save_nulls=save_nulls,
+                empty_lists_are_null=empty_lists_are_null,
+                only_update_existing_nulls=only_update_existing_nulls,
+                allow_list_overlaps=allow_list_overlaps,
+                using=self.db,
+            )
+            if existing:
+                lookup_cache.discard(existing, self.db)
+                if logger:
+                    logger.info(
+                        "Upserted %s %s" % (str(self.model), str(unique_data))
+                    )
+                if command_log and hasattr(existing, "command_logs"):
+                    existing.command_logs.add(command_log)
+                    existing.commands.add(command_log.command)
+                if return_object:
+                    return existing
+                return
+
         if force_create:
             existing = None
         else:
@@ -438,6 +2738,7 @@ class BasicExtendedManager(models.QuerySet):
                 empty_lists_are_null=empty_lists_are_null,
                 allow_list_overlaps=allow_list_overlaps,
                 logger=logger,
+                use_cache=use_cache,
             )
         if not existing:
             try:
@@ -492,9 +2793,324 @@ class BasicExtendedManager(models.QuerySet):
             if command_log and hasattr(existing, "command_logs"):
                 existing.command_logs.add(command_log)
                 existing.commands.add(command_log.command)
+        if cache_key and existing:
+            lookup_cache.set(cache_key, existing)
         if return_object:
             return existing
 
+    def bulk_create_or_update(
+        self,
+        records,
+        unique_fields,
+        save_nulls=False,
+        empty_lists_are_null=True,
+        only_update_existing_nulls=False,
+        allow_list_overlaps=False,
+        batch_size=1000,
+        logger=None,
+    ):
+
+        """
+        A batched version of `create_or_update` for lists of records. For each batch, existing objects are looked up
+        in a single query, the records are applied to them in memory following the same `save_nulls`,
+        `empty_lists_are_null`, `only_update_existing_nulls` and `allow_list_overlaps` rules as `create_or_update`,
+        and the results are written with `bulk_create` and `bulk_update`. Records are matched to existing objects on
+        exact equality of all of the `unique_fields` (null values match nulls). Since the writes happen in bulk,
+        custom `save` methods and save signals are not run.
+
+        :param records: A list of dictionaries, each containing the unique fields and any other values for a record
+        :param unique_fields: The names of the fields that, taken together, identify an existing object
+        :param save_nulls: If True, null values will be saved and will overwrite existing data (default False, which
+        skips over null values)
+        :param empty_lists_are_null: If True (default), it will treat empty lists the same as it does null values
+        :param only_update_existing_nulls: If True, existing objects will only have their currently-null fields
+        updated
+        :param allow_list_overlaps: If True, list values will be merged into existing lists rather than replacing them
+        :param batch_size: The number of records to look up and write at a time
+        :param logger: Optional logger for recording errors
+        :return: A list of `(object, created)` tuples, in the same order as `records`
+        """
+
+        fields = [_get_lookup_field(self.model, f) for f in unique_fields]
+        writable_fields = set(
+            itertools.chain.from_iterable(
+                (f.name, f.attname)
+                for f in self.model._meta.concrete_fields
+                if not f.primary_key
+            )
+        )
+
+        results = []
+        for batch in chunk_list(records, batch_size):
+
+            keys = [
+                tuple(
+                    _normalize_lookup_value(field, record.get(name))
+                    for name, field in zip(unique_fields, fields)
+                )
+                for record in batch
+            ]
+
+            if len(fields) == 1:
+                values = set(key[0] for key in keys)
+                query = Q(
+                    **{
+                        "{}__in".format(unique_fields[0]): [
+                            v for v in values if v is not None
+                        ]
+                    }
+                )
+                if None in values:
+                    query |= Q(**{"{}__isnull".format(unique_fields[0]): True})
+            else:
+                query = Q()
+                for key in set(keys):
+                    query |= Q(**dict(zip(unique_fields, key)))
+
+            existing = {}
+            for obj in self.filter(query):
+                key = tuple(
+                    _freeze_value(getattr(obj, field.attname)) for field in fields
+                )
+                if key in existing:
+                    if logger:
+                        logger.error(
+                            "%s bulk_create_or_update query on %s returned multiple rows"
+                            % (str(dict(zip(unique_fields, key))), str(self.model))
+                        )
+                    raise self.model.MultipleObjectsReturned(
+                        "Multiple {} objects match {}".format(
+                            self.model.__name__, dict(zip(unique_fields, key))
+                        )
+                    )
+                existing[key] = obj
+
+            to_create = []
+            created_ids = set()
+            to_update = {}
+            updated_fields = set()
+            batch_results = []
+            for key, record in zip(keys, batch):
+                data = filter_field_dict(
+                    dict(record),
+                    drop_nulls=(not save_nulls),
+                    empty_lists_are_null=empty_lists_are_null,
+                )
+                obj = existing.get(key)
+                if obj is None:
+                    obj = self.model(
+                        **{
+                            k: v
+                            for k, v in data.items()
+                            if k == "pk" or field_exists(self.model, k)
+                        }
+                    )
+                    existing[key] = obj
+                    to_create.append(obj)
+                    created_ids.add(id(obj))
+                    batch_results.append((obj, True))
+                else:
+                    update_data = {
+                        k: v
+                        for k, v in data.items()
+                        if k in writable_fields and k not in unique_fields
+                    }
+                    changed = _merge_update_data(
+                        self.model,
+                        obj,
+                        update_data,
+                        empty_lists_are_null=empty_lists_are_null,
+                        only_update_existing_nulls=only_update_existing_nulls,
+                        allow_list_overlaps=allow_list_overlaps,
+                    )
+                    if id(obj) not in created_ids:
+                        to_update[obj.pk] = obj
+                        updated_fields.update(changed)
+                    batch_results.append((obj, False))
+
+            if to_create:
+                self.model.objects.bulk_create(to_create, batch_size=batch_size)
+            if to_update and updated_fields:
+                self.model.objects.bulk_update(
+                    list(to_update.values()),
+                    list(set(self.model._meta.get_field(f).name for f in updated_fields)),
+                    batch_size=batch_size,
+                )
+            if logger:
+                logger.info(
+                    "Created %i and updated %i %s objects"
+                    % (len(to_create), len(to_update), str(self.model))
+                )
+            results.extend(batch_results)
+
+        lookup_cache.discard_model(self.model)
+        return results
+
+    def copy_from_iterable(
+        self,
+        rows,
+        columns=None,
+        conflict=None,
+        unique_fields=None,
+        batch_size=10000,
+        tqdm_desc=None,
+    ):
+
+        """
+        Bulk loads rows into the model's table using Postgres' `COPY FROM STDIN`, which is dramatically faster than
+        saving objects one at a time. Rows are streamed, `batch_size` at a time, into a temporary staging table, and
+        then merged into the model's table with a single `INSERT ... SELECT`. Columns that don't correspond to fields
+        on the model are dropped (`pk` refers to the primary key), and fields that aren't provided are filled in with
+        their defaults for new rows. The whole load
+        runs in a single transaction. Since rows are written directly, the model's `save` method and save signals are
+        not run.
+
+        :param rows: An iterable of dictionaries, or of sequences if `columns` is provided. For dictionaries, the
+        columns are taken from the keys of the first row; keys that are missing from later rows are filled in with the
+        field's default, and keys that only appear in later rows are ignored.
+        :param columns: Optional list of column names for rows that are sequences
+        :param conflict: How to handle rows that conflict with existing ones: None (default) raises an error, "ignore"
+        skips them, and "update" overwrites the existing rows with the provided values (columns that weren't
+        provided keep their existing values)
+        :param unique_fields: The fields to check for conflicts, which must match a unique constraint on the model.
+        Required if `conflict` is "update".
+        :param batch_size: The number of rows to send to the database in each `COPY` batch
+        :param tqdm_desc: Optional description for the progress bar
+        :return: The number of rows inserted or updated
+        """
+
+        db = connections[self.db]
+        if db.vendor != "postgresql":
+            raise Exception("COPY-based loading requires a Postgres database")
+        if conflict not in (None, "ignore", "update"):
+            raise Exception("`conflict` must be None, 'ignore' or 'update'")
+        conflict_fields = None
+        if unique_fields:
+            conflict_fields = _get_conflict_fields(self.model, unique_fields)
+            if not conflict_fields:
+                raise Exception(
+                    "{} don't match a unique constraint on {}".format(
+                        unique_fields, self.model
+                    )
+                )
+        elif conflict == "update":
+            raise Exception(
+                "You must provide `unique_fields` to update conflicting rows"
+            )
+
+        rows = iter(rows)
+        if columns is None:
+            try:
+                first = next(rows)
+            except StopIteration:
+                return 0
+            columns = list(first.keys())
+            rows = itertools.chain([first], rows)
+        names = filter_field_dict(
+            {c: c for c in columns},
+            drop_nulls=False,
+            drop_underscore_joins=True,
+            model=self.model,
+        )
+        fields = []
+        indices = []
+        for i, column in enumerate(columns):
+            if column in names:
+                field = _get_lookup_field(self.model, column)
+                if field.concrete and field not in fields:
+                    fields.append(field)
+                    indices.append(i)
+        defaults = [
+            f
+            for f in self.model._meta.local_concrete_fields
+            if f not in fields
+            and f.has_default()
+            and not isinstance(f, models.AutoField)
+        ]
+
+        qn = db.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        staging = qn(
+            "tmp_{}_{}".format(self.model._meta.db_table, uuid.uuid4().hex[:8])
+        )
+        column_sql = ", ".join(qn(f.column) for f in fields + defaults)
+        merge = "INSERT INTO {} ({}) SELECT {} FROM {}".format(
+            table, column_sql, column_sql, staging
+        )
+        if conflict:
+            target = ""
+            if conflict_fields:
+                target = "({})".format(
+                    ", ".join(qn(f.column) for f in conflict_fields)
+                )
+            if conflict == "ignore":
+                merge += " ON CONFLICT {} DO NOTHING".format(target)
+            else:
+                merge += " ON CONFLICT {} DO UPDATE SET {}".format(
+                    target,
+                    ", ".join(
+                        "{0} = EXCLUDED.{0}".format(qn(f.column))
+                        for f in fields
+                        if f not in conflict_fields
+                    )
+                    or "{0} = EXCLUDED.{0}".format(qn(conflict_fields[0].column)),
+                )
+
+        batches = _chunk_iterable(rows, batch_size)
+        if tqdm_desc:
+            batches = tqdm(
+                batches,
+                desc=tqdm_desc,
+                disable=os.environ.get("DISABLE_TQDM", False),
+            )
+        with transaction.atomic(using=self.db), db.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE {} ON COMMIT DROP "
+                "AS SELECT {} FROM {} WITH NO DATA".format(staging, column_sql, table)
+            )
+            for batch in batches:
+                buffer = io.StringIO()
+                for row in batch:
+                    if isinstance(row, dict):
+                        values = [
+                            row[columns[i]] if columns[i] in row else f.get_default()
+                            for f, i in zip(fields, indices)
+                        ]
+                    else:
+                        values = [row[i] for i in indices]
+                    values = [_copy_text(f, v) for f, v in zip(fields, values)]
+                    values.extend(_copy_text(f, f.get_default()) for f in defaults)
+                    buffer.write(_copy_csv_row(values))
+                buffer.seek(0)
+                cursor.copy_expert(
+                    "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(
+                        staging, column_sql
+                    ),
+                    buffer,
+                )
+            cursor.execute(merge)
+            count = cursor.rowcount
+
+        lookup_cache.discard_model(self.model)
+        return count
+
+    def copy_from_df(self, df, **kwargs):
+
+        """
+        Bulk loads a Pandas DataFrame into the model's table using Postgres' `COPY FROM STDIN`. Columns are matched
+        to fields by name, and columns that don't exist on the model are ignored. Missing values (`NaN`, `None`,
+        `NaT`) are loaded as nulls. See `copy_from_iterable` for the available options.
+
+        :param df: A Pandas DataFrame
+        :param kwargs: Additional options for `copy_from_iterable` (`conflict`, `unique_fields`, `batch_size`,
+        `tqdm_desc`)
+        :return: The number of rows inserted or updated
+        """
+
+        return self.copy_from_iterable(
+            df.itertuples(index=False, name=None), columns=list(df.columns), **kwargs
+        )
+
     def fuzzy_ratios(
         self,
         field_names,
@@ -502,10 +3118,16 @@ class BasicExtendedManager(models.QuerySet):
         min_ratio=None,
         allow_partial=False,
         max_partial_difference=100,
+        limit=None,
+        batch_size=10000,
+        prefilter=False,
+        candidate_limit=1000,
+        similarity_threshold=None,
     ):
         """
         Given a snippet of text, computes the fuzzy ratios between the text and text that is stored on one or more
-        fields on all of the objects in the QuerySet.
+        fields on all of the objects in the QuerySet. Rows are streamed from the database in batches, and each batch
+        is scored at once with :py:mod:`rapidfuzz`'s `process.cdist`.
 
         :param field_names: The names of the text fields to compare
         :param text: A string of text to compare
@@ -513,26 +3135,85 @@ class BasicExtendedManager(models.QuerySet):
         :param allow_partial: Whether or not to allow partial fuzzy ratios when computing text similarity.
         :param max_partial_difference: The maximum difference between the absolute and partial ratio that's
         allowed to return a result.
+        :param limit: Optional maximum number of results to return (the top matches are kept as the rows are scored,
+        and once `limit` matches have been found, weaker rows are skipped early)
+        :param batch_size: The number of rows to load and score at a time
+        :param prefilter: If True, Postgres is first asked for candidates that are similar to the text using the
+        `pg_trgm` `%` operator (which can use a trigram GIN or GiST index on the fields, instead of scanning the
+        table), and only the `candidate_limit` candidates with the highest trigram similarity are scored. Rows with
+        a trigram similarity below `similarity_threshold` won't be returned. Requires the `pg_trgm` extension, as
+        with `trigram_similarities`.
+        :param candidate_limit: The maximum number of candidates to score when `prefilter` is True
+        :param similarity_threshold: Optional minimum trigram similarity for candidates when `prefilter` is True;
+        if not provided, the database's `pg_trgm.similarity_threshold` setting is used (0.3 by default). Lower values
+        return more candidates, at the cost of the index being less selective.
         :return: A list of results with the primary keys of the compared objects and their fuzzy ratios
         """
 
+        score_cutoff = min_ratio if not allow_partial else None
         results = []
-        for row in self.values("pk", *field_names):
-            result = row
-            row["fuzzy_ratio"] = get_fuzzy_ratio(
-                " ".join([row[field_name] for field_name in field_names]), text
+        if prefilter:
+            if len(field_names) > 1:
+                search_field = "CONCAT({0})".format(", ' ', ".join(field_names))
+            else:
+                search_field = field_names[0]
+            candidates = (
+                self.extra(
+                    select={"similarity": "similarity({0}, %s)".format(search_field)},
+                    select_params=(text,),
+                    where=["{0} %% %s".format(search_field)],
+                    params=[text],
+                )
+                .order_by("-similarity")
+                .values("pk", "similarity", *field_names)[:candidate_limit]
             )
-            if allow_partial:
-                partial_ratio = get_fuzzy_partial_ratio(
-                    " ".join([row[field_name] for field_name in field_names]), text
-                )
-                substring_variation = abs(result["fuzzy_ratio"] - partial_ratio)
-                row["fuzzy_ratio"] = max([row["fuzzy_ratio"], partial_ratio])
-            if (not min_ratio or row["fuzzy_ratio"] >= min_ratio) and (
-                not allow_partial or substring_variation <= max_partial_difference
-            ):
-                results.append(result)
+            with transaction.atomic(using=self.db):
+                if similarity_threshold is None:
+                    rows = list(candidates)
+                else:
+                    # SET LOCAL lasts until the outermost transaction ends, so the previous threshold is restored
+                    # once the candidates have been loaded (if the query fails, rolling back undoes the SET instead)
+                    with connections[self.db].cursor() as cursor:
+                        cursor.execute("SHOW pg_trgm.similarity_threshold")
+                        previous = cursor.fetchone()[0]
+                        cursor.execute(
+                            "SET LOCAL pg_trgm.similarity_threshold = %s",
+                            [similarity_threshold],
+                        )
+                        rows = list(candidates)
+                        cursor.execute(
+                            "SET LOCAL pg_trgm.similarity_threshold = %s", [previous]
+                        )
+        else:
+            rows = self.values("pk", *field_names).iterator(chunk_size=batch_size)
+        for offset, batch in enumerate(_chunk_iterable(rows, batch_size)):
+            texts = [" ".join(row[f] or "" for f in field_names) for row in batch]
+            scores, keep = _fuzzy_scores(
+                texts,
+                text,
+                min_ratio=min_ratio,
+                allow_partial=allow_partial,
+                max_partial_difference=max_partial_difference,
+                score_cutoff=score_cutoff,
+            )
+            for i in numpy.flatnonzero(keep):
+                row = batch[i]
+                row.pop("similarity", None)
+                row["fuzzy_ratio"] = float(scores[i])
+                if not limit:
+                    results.append(row)
+                    continue
+                # ties are broken in favor of the rows that were loaded first
+                item = (row["fuzzy_ratio"], -(offset * batch_size + i), row)
+                if len(results) < limit:
+                    heapq.heappush(results, item)
+                else:
+                    heapq.heappushpop(results, item)
+            if limit and len(results) == limit and not allow_partial:
+                score_cutoff = max(score_cutoff or 0, results[0][0])
 
+        if limit:
+            return [row for _, _, row in sorted(results, reverse=True)]
         return sorted(results, key=lambda x: x["fuzzy_ratio"], reverse=True)
 
     def fuzzy_ratio_best_match(
@@ -568,12 +3249,165 @@ class BasicExtendedManager(models.QuerySet):
             min_ratio=min_ratio,
             allow_partial=allow_partial,
             max_partial_difference=max_partial_difference,
+            limit=1,
         )
         if len(results) == 0:
             return None
         else:
             return (self.get(pk=results[0]["pk"]), results[0]["fuzzy_ratio"])
 
+    def fuzzy_ratios_many(
+        self,
+        field_names,
+        texts,
+        min_ratio=None,
+        allow_partial=False,
+        max_partial_difference=100,
+        top_k=10,
+        batch_size=10000,
+        text_batch_size=1000,
+        workers=-1,
+    ):
+
+        """
+        Computes fuzzy ratios for a whole batch of comparison texts at once. The rows in the QuerySet are only read
+        from the database once; each batch of rows is then scored against the texts, `text_batch_size` at a time, in
+        calls to :py:mod:`rapidfuzz`'s `process.cdist` that are spread across multiple cores, and the top matches for
+        each text are kept as the rows are scored. This is much faster than calling `fuzzy_ratios` once per text.
+        Scores are computed as 32-bit floats, and each call holds a `batch_size` by `text_batch_size` matrix of them
+        in memory (two, if `allow_partial` is True); the ratios of the final matches are then recomputed exactly.
+
+        .. code-block:: python
+
+            >>> results = my_query_set.fuzzy_ratios_many(["text_field"], ["first name", "second name"], top_k=3)
+            >>> results[1]  # the top 3 matches for "second name"
+
+        :param field_names: The names of the text fields to compare
+        :param texts: A list of strings to compare
+        :param min_ratio: The minimum fuzzy ratio allowed to return results.
+        :param allow_partial: Whether or not to allow partial fuzzy ratios when computing text similarity.
+        :param max_partial_difference: The maximum difference between the absolute and partial ratio that's
+        allowed to return a result.
+        :param top_k: The maximum number of matches to return for each text; if None, all matches are returned
+        :param batch_size: The number of rows to load and score at a time
+        :param text_batch_size: The number of texts to score each batch of rows against at a time
+        :param workers: The number of threads to use for scoring (-1 uses all available cores)
+        :return: A list with an entry for each of the texts, in the same order; each entry is a list of results with
+        the primary keys of the compared objects and their fuzzy ratios, like `fuzzy_ratios`
+        """
+
+        texts = list(texts)
+        best = [[] for _ in texts]
+        if not texts:
+            return best
+        rows = self.values("pk", *field_names).iterator(chunk_size=batch_size)
+        for offset, batch in enumerate(_chunk_iterable(rows, batch_size)):
+            corpus = [" ".join(row[f] or "" for f in field_names) for row in batch]
+            for start in range(0, len(texts), text_batch_size):
+                queries = range(start, min(start + text_batch_size, len(texts)))
+                score_cutoff = None
+                if not allow_partial:
+                    score_cutoff = min_ratio
+                    if top_k and all(len(best[j]) == top_k for j in queries):
+                        # rows that can't beat any of these texts' current matches are skipped early
+                        score_cutoff = max(
+                            score_cutoff or 0, min(-best[j][-1][0] for j in queries)
+                        )
+                scores, keep = _fuzzy_score_matrix(
+                    corpus,
+                    texts[queries.start : queries.stop],
+                    min_ratio=min_ratio,
+                    allow_partial=allow_partial,
+                    max_partial_difference=max_partial_difference,
+                    score_cutoff=score_cutoff,
+                    workers=workers,
+                    dtype=numpy.float32,
+                )
+                for column_index, j in enumerate(queries):
+                    indices = numpy.flatnonzero(keep[:, column_index])
+                    column = scores[indices, column_index]
+                    if top_k and len(indices) > top_k:
+                        # keep everything tied with the k-th best score, so ties can be broken by row order
+                        kth = numpy.partition(column, -top_k)[-top_k]
+                        indices = indices[column >= kth]
+                        column = scores[indices, column_index]
+                    candidates = best[j] + [
+                        (-float(score), offset * batch_size + int(i), batch[i])
+                        for score, i in zip(column, indices)
+                    ]
+                    # ties are broken in favor of the rows that were loaded first
+                    candidates.sort(key=lambda x: x[:2])
+                    best[j] = candidates[:top_k] if top_k else candidates
+
+        results = []
+        for text, matches in zip(texts, best):
+            # the final ratios are recomputed at full precision, so they match `fuzzy_ratios`
+            ratios = []
+            if matches:
+                ratios, _ = _fuzzy_scores(
+                    [
+                        " ".join(row[f] or "" for f in field_names)
+                        for _, _, row in matches
+                    ],
+                    text,
+                    allow_partial=allow_partial,
+                    max_partial_difference=max_partial_difference,
+                )
+            results.append(
+                [
+                    dict(row, fuzzy_ratio=float(ratio))
+                    for (_, _, row), ratio in zip(matches, ratios)
+                ]
+            )
+        return results
+
+    def fuzzy_best_matches(
+        self,
+        field_names,
+        texts,
+        min_ratio=None,
+        allow_partial=False,
+        max_partial_difference=100,
+        batch_size=10000,
+        text_batch_size=1000,
+        workers=-1,
+    ):
+
+        """
+        Returns the object with the greatest fuzzy ratio in the QuerySet for each of a batch of comparison texts.
+        The batch version of `fuzzy_ratio_best_match`; the QuerySet is read once and scored against all of the
+        texts at once (see `fuzzy_ratios_many`), and the matching objects are then loaded in a single query.
+
+        :param field_names: The names of the text fields to compare
+        :param texts: A list of strings to compare
+        :param min_ratio: The minimum fuzzy ratio allowed to return results.
+        :param allow_partial: Whether or not to allow partial fuzzy ratios when computing text similarity.
+        :param max_partial_difference: The maximum difference between the absolute and partial ratio that's
+        allowed to return a result.
+        :param batch_size: The number of rows to load and score at a time
+        :param text_batch_size: The number of texts to score each batch of rows against at a time
+        :param workers: The number of threads to use for scoring (-1 uses all available cores)
+        :return: A list with an entry for each of the texts, in the same order; each entry is a tuple of the object
+        with the greatest similarity to the text and its fuzzy ratio, or None if there wasn't a match
+        """
+
+        results = self.fuzzy_ratios_many(
+            field_names,
+            texts,
+            min_ratio=min_ratio,
+            allow_partial=allow_partial,
+            max_partial_difference=max_partial_difference,
+            top_k=1,
+            batch_size=batch_size,
+            text_batch_size=text_batch_size,
+            workers=workers,
+        )
+        objects = self.in_bulk({r[0]["pk"] for r in results if r})
+        return [
+            (objects[r[0]["pk"]], r[0]["fuzzy_ratio"]) if r else None
+            for r in results
+        ]
+
     def levenshtein_differences(self, field_names, text, max_difference=None):
 
         """
@@ -640,7 +3474,20 @@ class BasicExtendedManager(models.QuerySet):
         else:
             return (self.get(pk=results[0]["pk"]), results[0]["difference"])
 
-    def tfidf_similarities(self, field_names, text, min_similarity=None):
+    def tfidf_index(self, field_names, **vectorizer_kwargs):
+
+        """
+        Builds a reusable TF-IDF index over one or more text fields in the QuerySet, which can be passed to
+        `tfidf_similarities` to avoid refitting the vectorizer on every search. See `TfidfIndex`.
+
+        :param field_names: The names of the text fields to index
+        :param vectorizer_kwargs: Additional arguments to pass to scikit-learn's `TfidfVectorizer`
+        :return: A `TfidfIndex`
+        """
+
+        return TfidfIndex(self, field_names, **vectorizer_kwargs)
+
+    def tfidf_similarities(self, field_names, text, min_similarity=None, index=None):
 
         """
         Given one or more text fields, computes the TF-IDF cosine similarities between the objects in the QuerySet and
@@ -649,21 +3496,41 @@ class BasicExtendedManager(models.QuerySet):
         :param field_names: The names of the text fields to compare
         :param text: A string of text to compare
         :param min_similarity: The minimum similarity allowed for a result to be returned.
+        :param index: Optional `TfidfIndex` (from `tfidf_index`) to search, instead of fitting a new TF-IDF model to
+        the QuerySet. The index must have been built on the same `field_names`. The QuerySet's values are loaded in a
+        single query and the search is restricted to its rows, so only rows that are in both the index and the
+        QuerySet are returned.
         :return: A list of results with the primary keys of the compared objects and their TF-IDF similarities
         """
 
-        df = pandas.DataFrame(list(self.values("pk", *field_names)))
+        if index is not None:
+            if list(field_names) != list(index.field_names):
+                raise ValueError(
+                    "The index was built on {}, not {}".format(
+                        index.field_names, list(field_names)
+                    )
+                )
+            rows = {row["pk"]: row for row in self.values("pk", *field_names)}
+            results = []
+            for similarity in index.query(
+                text, top_k=None, min_similarity=min_similarity, pks=list(rows)
+            ):
+                row = rows[similarity["pk"]]
+                row["similarity"] = similarity["similarity"]
+                results.append(row)
+            return results
+
+        rows = list(self.values("pk", *field_names))
+        if not rows:
+            return []
+        df = pandas.DataFrame(rows)
         df["search_text"] = vector_concat_text(*[df[f] for f in field_names])
         h = TextDataFrame(df, "search_text")
-        similarities = h.search_corpus(text)
-        results = []
-        for index, row in similarities.iterrows():
-            pk = df.loc[index]["pk"]
-            if not min_similarity or row["search_cosine_similarity"] >= min_similarity:
-                result = self.model.objects.filter(pk=pk).values("pk", *field_names)[0]
-                result["similarity"] = row["search_cosine_similarity"]
-                results.append(result)
-        return results
+        df["similarity"] = h.search_corpus(text)["search_cosine_similarity"]
+        if min_similarity:
+            df = df[df["similarity"] >= min_similarity]
+        df = df.sort_values("similarity", ascending=False, kind="stable")
+        return df[list(rows[0].keys()) + ["similarity"]].to_dict("records")
 
     def tfidf_similarity_best_match(self, field_names, text, min_similarity=None):
 
@@ -1,3 +1,7 @@
 from .base import BaseTests  # noqa: F401
 from .abstract_models import AbstractModelTests  # noqa: F401
-from .managers import ManagerTests  # noqa: F401
+from .managers import (  # noqa: F401
+    ManagerTests,
+    ParallelManagerTests,
+    ServerSideCursorTests,
+)
@@ -166,6 +166,28 @@ class BaseTests(DjangoTestCase):
         self.assertEqual(result["object_id"], obj.pk)
         self.assertEqual(result["content_type"].name, "test model")
 
+        result = filter_field_dict(
+            {"pk": 1, "text_field": "test", "fake_field": 1, "foreign_key__pk": 2},
+            drop_underscore_joins=False,
+            model=TestModel,
+        )
+        self.assertEqual(
+            result, {"pk": 1, "text_field": "test", "foreign_key__pk": 2}
+        )
+
+    def test_get_field_lookup(self):
+
+        from django_pewtils import get_field_lookup
+
+        lookup = get_field_lookup(TestModel)
+        self.assertIs(lookup["foreign_key"], TestModel._meta.get_field("foreign_key"))
+        self.assertIs(lookup["foreign_key_id"], lookup["foreign_key"])
+        self.assertNotIn("fake_field", lookup)
+        self.assertIs(get_field_lookup(TestModel), lookup)
+        TestModel._meta._expire_cache()
+        self.assertIsNot(get_field_lookup(TestModel), lookup)
+        self.assertEqual(get_field_lookup(TestModel).keys(), lookup.keys())
+
     def test_field_exists(self):
 
         from django_pewtils import field_exists
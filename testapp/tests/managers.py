@@ -1,8 +1,11 @@
 from __future__ import print_function
+import importlib
 import pandas as pd
 import os
+import unittest
+from unittest.mock import patch
 
-from django.test import TestCase as DjangoTestCase
+from django.test import TestCase as DjangoTestCase, TransactionTestCase
 from django.conf import settings
 
 from pewtils import is_not_null
@@ -10,6 +13,12 @@ from pewtils import is_not_null
 from testapp.models import TestModel, SecondTestModel
 
 
+def _text_length(obj):
+    if obj.pk == 3:
+        raise ValueError("bad object")
+    return len(obj.text_field)
+
+
 class ManagerTests(DjangoTestCase):
     """
     To test, navigate to django_pewtils root folder and run `python manage.py test testapp.tests`.
@@ -58,6 +67,71 @@ class ManagerTests(DjangoTestCase):
         self.assertTrue(isinstance(df, pd.DataFrame))
         self.assertEqual(len(df), 0)
 
+        TestModel.objects.filter(pk=1).update(text_field="café – naïve ✓")
+        df = TestModel.objects.all().to_df(copy=True)
+        self.assertEqual(df.set_index("id").loc[1, "text_field"], "café – naïve ✓")
+        self.assertEqual(len(df.columns), 7)
+        self.assertEqual(len(df), TestModel.objects.all().count())
+        self.assertEqual(
+            sorted(df["id"].tolist()),
+            sorted(TestModel.objects.values_list("pk", flat=True)),
+        )
+
+        for copy in [False, True]:
+            chunks = list(TestModel.objects.all().to_df(copy=copy, chunksize=20))
+            self.assertEqual(len(chunks[0]), 20)
+            self.assertEqual(len(chunks[0].columns), 7)
+            self.assertEqual(
+                sum(len(c) for c in chunks), TestModel.objects.all().count()
+            )
+        self.assertEqual(
+            list(TestModel.objects.filter(pk__in=[]).to_df(chunksize=20)), []
+        )
+
+        TestModel.objects.filter(pk=1).update(array_field=["a", "b,c"])
+        for copy in [False, True]:
+            df = TestModel.objects.order_by("pk").to_df(copy=copy, typed=True)
+            self.assertEqual(str(df["id"].dtype), "Int32")
+            self.assertEqual(str(df["foreign_key_id"].dtype), "Int32")
+            self.assertEqual(df[df["id"] == 1]["array_field"].values[0], ["a", "b,c"])
+            chunks = list(
+                TestModel.objects.order_by("pk").to_df(
+                    copy=copy, chunksize=20, typed=True
+                )
+            )
+            self.assertEqual(str(chunks[-1]["foreign_key_id"].dtype), "Int32")
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "requires pyarrow")
+    def test_to_arrow(self):
+
+        import pyarrow
+        import tempfile
+
+        TestModel.objects.filter(pk=1).update(array_field=["a", "b"])
+        table = TestModel.objects.all().to_arrow(batch_size=7)
+        self.assertEqual(table.num_rows, TestModel.objects.count())
+        self.assertEqual(len(table.columns), 7)
+        self.assertEqual(table.schema.field("id").type, pyarrow.int32())
+        self.assertEqual(table.schema.field("foreign_key_id").type, pyarrow.int32())
+        self.assertFalse(table.schema.field("id").nullable)
+        self.assertTrue(table.schema.field("foreign_key_id").nullable)
+        self.assertEqual(
+            table.schema.field("array_field").type, pyarrow.list_(pyarrow.string())
+        )
+        rows = {row["id"]: row for row in table.to_pylist()}
+        self.assertEqual(rows[1]["array_field"], ["a", "b"])
+
+        table = TestModel.objects.filter(pk__lt=10).to_arrow(
+            field_names=["pk", "text_field"]
+        )
+        self.assertEqual(table.column_names, ["id", "text_field"])
+
+        with tempfile.NamedTemporaryFile(suffix=".parquet") as f:
+            count = TestModel.objects.all().to_parquet(f.name, row_group_size=10)
+            self.assertEqual(count, TestModel.objects.count())
+            df = pd.read_parquet(f.name)
+            self.assertEqual(len(df), count)
+
     def test_chunk(self):
 
         items = []
@@ -65,22 +139,275 @@ class ManagerTests(DjangoTestCase):
             items.append(item)
         self.assertTrue(len(items) == TestModel.objects.count())
 
+        for integer_pk in [True, False]:
+            with patch(
+                "django_pewtils.managers._has_integer_pk", return_value=integer_pk
+            ):
+                items = [
+                    item.pk
+                    for item in TestModel.objects.filter(pk__gte=10).chunk(
+                        size=7, randomize=True, seed=3
+                    )
+                ]
+                self.assertEqual(
+                    sorted(items),
+                    list(
+                        TestModel.objects.filter(pk__gte=10)
+                        .order_by("pk")
+                        .values_list("pk", flat=True)
+                    ),
+                )
+                self.assertNotEqual(items, sorted(items))
+                self.assertEqual(
+                    items,
+                    [
+                        item.pk
+                        for item in TestModel.objects.filter(pk__gte=10).chunk(
+                            size=7, randomize=True, seed=3
+                        )
+                    ],
+                )
+
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+
+        with patch("django_pewtils.managers._estimated_count", return_value=1):
+            with CaptureQueriesContext(connection) as queries:
+                items = [
+                    item.pk
+                    for item in TestModel.objects.all().chunk(
+                        size=2, randomize=True, seed=3
+                    )
+                ]
+        self.assertEqual(
+            sorted(items),
+            list(TestModel.objects.order_by("pk").values_list("pk", flat=True)),
+        )
+        self.assertGreater(
+            len([q for q in queries if q["sql"].endswith("LIMIT 20")]), 1
+        )
+
+        items = list(
+            TestModel.objects.filter(pk__gte=10).chunk(
+                size=7, keyset=True, tqdm_desc="Keyset"
+            )
+        )
+        self.assertEqual(
+            [item.pk for item in items],
+            list(
+                TestModel.objects.filter(pk__gte=10)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            ),
+        )
+
+        rows = list(
+            TestModel.objects.filter(pk__gte=10)
+            .values("text_field")
+            .chunk(size=7, keyset=True)
+        )
+        self.assertEqual(
+            rows,
+            list(
+                TestModel.objects.filter(pk__gte=10)
+                .order_by("pk")
+                .values("text_field")
+            ),
+        )
+        self.assertEqual(
+            list(
+                TestModel.objects.values_list("pk", flat=True).chunk(
+                    size=7, keyset=True
+                )
+            ),
+            list(TestModel.objects.order_by("pk").values_list("pk", flat=True)),
+        )
+
+        sliced = TestModel.objects.order_by("-pk")[:5]
+        self.assertEqual(
+            [item.pk for item in sliced.chunk(size=2, keyset=True)],
+            [item.pk for item in sliced],
+        )
+
+        items = list(TestModel.objects.all().chunk(size=7, server_side_cursor=True))
+        self.assertEqual(len(items), TestModel.objects.count())
+
     def test_sample(self):
 
         sample = TestModel.objects.sample(10)
         self.assertTrue(sample.count() == 10)
 
+        from django_pewtils.managers import BasicExtendedManager
+
+        with patch.object(
+            BasicExtendedManager,
+            "_reservoir_sample",
+            side_effect=AssertionError("reservoir sampling used"),
+        ):
+            self.assertEqual(TestModel.objects.sample(10, seed=1).count(), 10)
+        with patch.object(
+            BasicExtendedManager, "_pk_range_sample", side_effect=AssertionError
+        ):
+            self.assertEqual(
+                TestModel.objects.filter(pk__lt=40).sample(10, seed=1).count(), 10
+            )
+
+        for method in ["reservoir", "system", "bernoulli", "pk_range"]:
+            sample = TestModel.objects.filter(pk__lt=40).sample(
+                10, method=method, seed=42
+            )
+            self.assertEqual(sample.count(), 10)
+            self.assertEqual(sample.filter(pk__gte=40).count(), 0)
+            self.assertEqual(
+                set(sample.values_list("pk", flat=True)),
+                set(
+                    TestModel.objects.filter(pk__lt=40)
+                    .sample(10, method=method, seed=42)
+                    .values_list("pk", flat=True)
+                ),
+            )
+        self.assertEqual(TestModel.objects.filter(pk__lt=5).sample(10).count(), 5)
+
+        TestModel.objects.filter(pk__lt=10).update(text_field="stratum")
+        sample = TestModel.objects.sample(10, seed=1, stratify_by="text_field")
+        self.assertEqual(sample.count(), 10)
+        self.assertEqual(sample.filter(text_field="stratum").count(), 2)
+
     def test_chunk_update(self):
 
         TestModel.objects.chunk_update(size=2, text_field="test")
         for obj in TestModel.objects.all():
             self.assertEqual(obj.text_field, "test")
 
+        TestModel.objects.chunk_update(
+            size=3, server_side_cursor=True, text_field="streamed"
+        )
+        self.assertEqual(
+            TestModel.objects.filter(text_field="streamed").count(),
+            TestModel.objects.count(),
+        )
+
+        TestModel.objects.filter(pk__gte=20).chunk_update(
+            size=4, pk_ranges=True, tqdm_desc=None, text_field="ranged"
+        )
+        self.assertEqual(
+            TestModel.objects.filter(text_field="ranged").count(),
+            TestModel.objects.filter(pk__gte=20).count(),
+        )
+        self.assertEqual(
+            TestModel.objects.filter(pk__lt=20, text_field="ranged").count(), 0
+        )
+
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+
+        from django.db.models import Q
+
+        TestModel.objects.create(pk=100000)
+        sparse = TestModel.objects.filter(Q(pk__gte=1, pk__lte=20) | Q(pk=100000))
+        with CaptureQueriesContext(connection) as queries:
+            sparse.chunk_update(
+                size=10, pk_ranges=True, tqdm_desc="Ranges", text_field="sparse"
+            )
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(
+            TestModel.objects.filter(text_field="sparse").count(), sparse.count()
+        )
+
     def test_chunk_delete(self):
 
+        TestModel.objects.filter(pk__lt=10).chunk_delete(
+            size=2, server_side_cursor=True
+        )
+        self.assertEqual(TestModel.objects.filter(pk__lt=10).count(), 0)
+        self.assertTrue(TestModel.objects.count() > 0)
+
         TestModel.objects.chunk_delete(size=2)
         self.assertTrue(TestModel.objects.count() == 0)
 
+    def test_chunk_delete_fast(self):
+
+        from django_pewtils import get_model
+
+        m2m_model = get_model("testmodel_many_to_many", app_name="testapp")
+
+        report = TestModel.objects.filter(pk__lt=10).chunk_delete(dry_run=True)
+        counts = {(r["model"], r["action"]): r["count"] for r in report}
+        self.assertEqual(report[-1]["model"], TestModel)
+        self.assertEqual(report[-1]["action"], "delete")
+        self.assertEqual(
+            counts[(TestModel, "delete")], TestModel.objects.filter(pk__lt=10).count()
+        )
+        self.assertEqual(
+            counts[(m2m_model, "delete")],
+            m2m_model.objects.filter(testmodel_id__lt=10).count(),
+        )
+        self.assertTrue(TestModel.objects.filter(pk__lt=10).count() > 0)
+
+        second_count = SecondTestModel.objects.count()
+        TestModel.objects.chunk_delete(size=7, fast=True)
+        self.assertEqual(TestModel.objects.count(), 0)
+        self.assertEqual(m2m_model.objects.count(), 0)
+        self.assertEqual(SecondTestModel.objects.count(), second_count)
+        self.assertEqual(
+            SecondTestModel.objects.filter(foreign_key__isnull=False).count(), 0
+        )
+
+    def test_parallel_map(self):
+
+        results, errors = TestModel.objects.filter(pk__lt=20).parallel_map(
+            _text_length, size=6, workers=1, tqdm_desc="Mapping"
+        )
+        self.assertEqual(
+            results,
+            {
+                obj.pk: len(obj.text_field)
+                for obj in TestModel.objects.filter(pk__lt=20).exclude(pk=3)
+            },
+        )
+        self.assertEqual(list(errors.keys()), [3])
+        self.assertIn("bad object", errors[3])
+        with self.assertRaises(Exception):
+            TestModel.objects.all().parallel_map(_text_length, workers=2)
+
+    def test_chunk_threaded(self):
+
+        results, errors, metrics = TestModel.objects.filter(pk__lt=20).chunk_threaded(
+            _text_length, size=3, workers=3, prefetch=1, tqdm_desc="Threaded"
+        )
+        self.assertEqual(
+            results,
+            {
+                obj.pk: len(obj.text_field)
+                for obj in TestModel.objects.filter(pk__lt=20).exclude(pk=3)
+            },
+        )
+        self.assertEqual(list(errors.keys()), [3])
+        self.assertEqual(metrics["objects"], 20)
+        self.assertEqual(metrics["batches"], 7)
+        self.assertLessEqual(metrics["max_queue_depth"], 1)
+        self.assertGreater(metrics["objects_per_second"], 0)
+
+    def test_achunk(self):
+
+        from asgiref.sync import async_to_sync
+
+        async def collect():
+            return [
+                obj.pk
+                async for obj in TestModel.objects.filter(pk__lt=20).achunk(size=7)
+            ]
+
+        self.assertEqual(async_to_sync(collect)(), list(range(20)))
+
+        async_to_sync(TestModel.objects.filter(pk__lt=10).achunk_update)(
+            size=3, text_field="async"
+        )
+        self.assertEqual(TestModel.objects.filter(text_field="async").count(), 10)
+        async_to_sync(TestModel.objects.filter(pk__lt=10).achunk_delete)(size=3)
+        self.assertEqual(TestModel.objects.filter(pk__lt=10).count(), 0)
+
     def test_inspect_delete(self):
 
         from django_pewtils import get_model
@@ -134,6 +461,166 @@ class ManagerTests(DjangoTestCase):
         )
         self.assertIsNotNone(obj)
 
+    def test_get_if_exists_match_any(self):
+
+        text = TestModel.objects.get(pk=1).text_field
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+
+        with CaptureQueriesContext(connection) as queries:
+            obj = TestModel.objects.get_if_exists(
+                {"pk": 123456, "foreign_key_self": 1}, match_any=True
+            )
+        self.assertEqual(obj.pk, 1)
+        self.assertEqual(len(queries), 1)
+        self.assertIn("UNION", queries[0]["sql"])
+        self.assertTrue(queries[0]["sql"].endswith("LIMIT 2"))
+        with self.assertNumQueries(1):
+            obj = TestModel.objects.get_if_exists(
+                {"pk": 123456, "text_field": text}, match_any=True
+            )
+        self.assertEqual(obj.pk, 1)
+        with self.assertNumQueries(1):
+            obj = TestModel.objects.get_if_exists(
+                {"pk": 123456, "foreign_key_self": 123456}, match_any=True
+            )
+        self.assertIsNone(obj)
+        with self.assertRaises(TestModel.MultipleObjectsReturned):
+            TestModel.objects.get_if_exists(
+                {"pk": 1, "foreign_key_self": 2}, match_any=True
+            )
+
+    def test_lookup_cache(self):
+
+        from django_pewtils.managers import lookup_cache
+
+        lookup_cache.clear()
+        obj = TestModel.objects.get_if_exists({"pk": 1}, use_cache=True)
+        with self.assertNumQueries(0):
+            self.assertIs(
+                TestModel.objects.get_if_exists({"pk": "1"}, use_cache=True), obj
+            )
+        self.assertEqual((lookup_cache.hits, lookup_cache.misses), (1, 1))
+        self.assertIsNone(TestModel.objects.get_if_exists({"pk": 99998}, use_cache=True))
+        self.assertEqual(len(lookup_cache), 1)
+
+        updated = TestModel.objects.create_or_update(
+            {"pk": 1}, {"text_field": "cached"}, use_cache=True
+        )
+        self.assertIs(updated, obj)
+        self.assertEqual(len(lookup_cache), 1)
+        TestModel.objects.get(pk=1).save()
+        self.assertEqual(len(lookup_cache), 0)
+
+        obj = TestModel.objects.create_or_update(
+            {"pk": 99998}, {"text_field": "new"}, use_cache=True
+        )
+        with self.assertNumQueries(0):
+            self.assertIs(
+                TestModel.objects.get_if_exists({"pk": 99998}, use_cache=True), obj
+            )
+        obj.delete()
+        self.assertIsNone(TestModel.objects.get_if_exists({"pk": 99998}, use_cache=True))
+
+        for pk in range(5):
+            TestModel.objects.get_if_exists({"pk": pk}, use_cache=True)
+        lookup_cache.maxsize = 3
+        TestModel.objects.get_if_exists({"pk": 5}, use_cache=True)
+        self.assertEqual(len(lookup_cache), 3)
+        lookup_cache.maxsize = 10000
+
+        TestModel.objects.filter(pk__lt=3).chunk_update(
+            size=2, tqdm_desc=None, text_field="bulk"
+        )
+        self.assertEqual(len(lookup_cache), 0)
+        obj = TestModel.objects.get_if_exists({"pk": 1}, use_cache=True)
+        self.assertEqual(obj.text_field, "bulk")
+        TestModel.objects.copy_from_iterable(
+            [{"id": 1, "text_field": "copied"}], conflict="update", unique_fields=["id"]
+        )
+        self.assertEqual(
+            TestModel.objects.get_if_exists({"pk": 1}, use_cache=True).text_field,
+            "copied",
+        )
+        lookup_cache.clear()
+
+    def test_update_write_plan(self):
+
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+
+        obj = TestModel.objects.get(pk=1)
+        with CaptureQueriesContext(connection) as queries:
+            TestModel.objects.create_or_update(
+                {"pk": 1}, {"text_field": "partial", "foreign_key": 2}
+            )
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"text_field"', updates[0])
+        self.assertIn('"foreign_key_id"', updates[0])
+        self.assertNotIn('"array_field"', updates[0])
+        obj.refresh_from_db()
+        self.assertEqual((obj.text_field, obj.foreign_key_id), ("partial", 2))
+
+        from django.db.models.signals import post_save
+
+        saved = []
+
+        def receiver(sender, instance, **kwargs):
+            saved.append(instance.pk)
+
+        post_save.connect(receiver, sender=TestModel)
+        try:
+            TestModel.objects.create_or_update(
+                {"pk": 1},
+                {"text_field": "partial", "foreign_key": SecondTestModel(pk=2)},
+            )
+        finally:
+            post_save.disconnect(receiver, sender=TestModel)
+        self.assertEqual(saved, [1])
+
+        TestModel.objects.create_or_update(
+            {"pk": 1}, {"array_field": ["1", "x"]}, allow_list_overlaps=True
+        )
+        obj.refresh_from_db()
+        self.assertEqual(obj.array_field, ["1", "x"])
+
+    def test_get_many_if_exists(self):
+
+        TestModel.objects.filter(pk=1).update(array_field=["12345"])
+        TestModel.objects.filter(pk__in=[5, 6]).update(text_field="duplicate")
+        second = SecondTestModel.objects.get(pk=2)
+        records = [
+            {"pk": 1},
+            {"pk": "2"},
+            {"pk": 123456},
+            {},
+            {"pk": None},
+            {"foreign_key_unique": 3, "text_field": second.text_field},
+            {"foreign_key_unique": 2, "text_field": second.text_field},
+            {"text_field__startswith": "duplicate", "pk": 5},
+            {"array_field": ["12345"]},
+            {"array_field": ["12345", "67890"]},
+        ]
+        results = TestModel.objects.get_many_if_exists(records[:5], batch_size=2)
+        self.assertEqual(
+            [obj.pk if obj else None for obj in results], [1, 2, None, None, None]
+        )
+        results = SecondTestModel.objects.get_many_if_exists(records[5:7])
+        self.assertEqual([obj.pk if obj else None for obj in results], [None, 2])
+        results = TestModel.objects.get_many_if_exists(records[7:])
+        self.assertEqual([obj.pk if obj else None for obj in results], [5, 1, None])
+        results = TestModel.objects.get_many_if_exists(
+            records[7:], allow_list_overlaps=True
+        )
+        self.assertEqual([obj.pk if obj else None for obj in results], [5, 1, 1])
+        results = SecondTestModel.objects.get_many_if_exists(
+            [{"text_field": None}], search_nulls=True
+        )
+        self.assertEqual(results, [None])
+        with self.assertRaises(TestModel.MultipleObjectsReturned):
+            TestModel.objects.get_many_if_exists([{"pk": 1}, {"text_field": "duplicate"}])
+
     def test_create_or_update(self):
 
         new_text = "testing one two three"
@@ -227,6 +714,213 @@ class ManagerTests(DjangoTestCase):
         self.assertEqual(obj.array_field, ["12345", "67890", "abcde"])
         self.assertEqual(obj.text_field, "one")
 
+    def test_create_or_update_upsert(self):
+
+        obj = TestModel.objects.create_or_update(
+            {"pk": 99999},
+            {"text_field": "upserted", "array_field": ["a", "b"]},
+            upsert=True,
+        )
+        self.assertEqual(obj.pk, 99999)
+        self.assertEqual(obj.text_field, "upserted")
+        self.assertEqual(obj.array_field, ["a", "b"])
+        self.assertEqual(TestModel.objects.get(pk=99999).array_field, ["a", "b"])
+
+        obj = TestModel.objects.create_or_update(
+            {"pk": 99999},
+            {"text_field": "ignored", "array_field": ["b", "c", "c"]},
+            upsert=True,
+            only_update_existing_nulls=True,
+        )
+        self.assertEqual(obj.text_field, "upserted")
+        self.assertEqual(obj.array_field, ["a", "b"])
+
+        obj = TestModel.objects.create_or_update(
+            {"pk": 99999},
+            {"text_field": None, "array_field": ["b", "c", "c"]},
+            upsert=True,
+            allow_list_overlaps=True,
+        )
+        self.assertEqual(obj.text_field, "upserted")
+        self.assertEqual(obj.array_field, ["a", "b", "c"])
+
+        TestModel.objects.filter(pk=1).update(text_field="")
+        obj = TestModel.objects.create_or_update(
+            {"pk": 1},
+            {"text_field": "filled"},
+            upsert=True,
+            only_update_existing_nulls=True,
+        )
+        self.assertEqual(obj.text_field, "filled")
+
+        obj = SecondTestModel.objects.create_or_update(
+            {"foreign_key_unique": TestModel.objects.get(pk=2), "dummy_field": "test"},
+            {"text_field": "constraint"},
+            upsert=True,
+        )
+        self.assertEqual(obj.pk, 2)
+        self.assertEqual(SecondTestModel.objects.get(pk=2).text_field, "constraint")
+
+        from django_pewtils.managers import _get_write_plan
+
+        def write_plan(model):
+            targets, _, partial_save = _get_write_plan(model)
+            return targets, ["array_field"], partial_save
+
+        # auto_now fields are set with their `pre_save` values, even when they aren't in `update_data`
+        TestModel.objects.filter(pk=3).update(array_field=["stale"])
+        with patch("django_pewtils.managers._get_write_plan", side_effect=write_plan):
+            obj = TestModel.objects.create_or_update(
+                {"pk": 3}, {"text_field": "refreshed"}, upsert=True
+            )
+        self.assertEqual(obj.text_field, "refreshed")
+        self.assertEqual(TestModel.objects.get(pk=3).array_field, [])
+
+        obj = TestModel.objects.create_or_update(
+            {"pk": 99997, "text_field": "no constraint"},
+            {"array_field": ["z"]},
+            upsert=True,
+        )
+        self.assertEqual(obj.pk, 99997)
+        self.assertEqual(obj.array_field, ["z"])
+
+    def test_bulk_create_or_update(self):
+
+        TestModel.objects.filter(pk=2).update(text_field=None)
+        records = [
+            {"pk": 1, "text_field": "bulk one", "array_field": ["abc"]},
+            {"pk": 2, "text_field": "bulk two"},
+            {"pk": 3, "text_field": None},
+            {"pk": 99998, "text_field": "new", "array_field": ["xyz"]},
+            {"pk": 99998, "array_field": ["uvw"]},
+        ]
+        results = TestModel.objects.bulk_create_or_update(
+            records,
+            unique_fields=["pk"],
+            allow_list_overlaps=True,
+            only_update_existing_nulls=True,
+            batch_size=3,
+        )
+        self.assertEqual(
+            [created for _, created in results], [False, False, False, True, False]
+        )
+        obj = TestModel.objects.get(pk=1)
+        self.assertNotEqual(obj.text_field, "bulk one")
+        self.assertEqual(obj.array_field, ["1"])
+        self.assertEqual(TestModel.objects.get(pk=2).text_field, "bulk two")
+        self.assertIsNotNone(TestModel.objects.get(pk=3).text_field)
+        obj = TestModel.objects.get(pk=99998)
+        self.assertEqual(obj.text_field, "new")
+        self.assertEqual(obj.array_field, ["xyz"])
+
+        results = TestModel.objects.bulk_create_or_update(
+            [{"pk": 1, "text_field": "bulk one", "array_field": ["abc"]}],
+            unique_fields=["pk"],
+            allow_list_overlaps=True,
+        )
+        obj = TestModel.objects.get(pk=1)
+        self.assertEqual(obj.text_field, "bulk one")
+        self.assertEqual(obj.array_field, ["1", "abc"])
+
+        results = SecondTestModel.objects.bulk_create_or_update(
+            [{"foreign_key_unique": 5, "dummy_field": "test", "text_field": "fk"}],
+            unique_fields=["foreign_key_unique", "dummy_field"],
+        )
+        self.assertFalse(results[0][1])
+        self.assertEqual(
+            SecondTestModel.objects.get(foreign_key_unique_id=5).text_field, "fk"
+        )
+
+    def test_copy_from_df(self):
+
+        df = pd.DataFrame(
+            [
+                {
+                    "id": 1000,
+                    "text_field": 'a "quoted", value\nwith a newline',
+                    "array_field": ["x", 'y"z', "back\\slash"],
+                    "not_a_field": 1,
+                },
+                {"id": 1001, "text_field": None, "array_field": []},
+            ]
+        )
+        count = TestModel.objects.copy_from_df(df)
+        self.assertEqual(count, 2)
+        obj = TestModel.objects.get(pk=1000)
+        self.assertEqual(obj.text_field, 'a "quoted", value\nwith a newline')
+        self.assertEqual(obj.array_field, ["x", 'y"z', "back\\slash"])
+        self.assertIsNone(TestModel.objects.get(pk=1001).text_field)
+
+        count = TestModel.objects.copy_from_df(df, conflict="ignore")
+        self.assertEqual(count, 0)
+
+        df["text_field"] = ["updated", ""]
+        count = TestModel.objects.copy_from_df(
+            df, conflict="update", unique_fields=["id"]
+        )
+        self.assertEqual(count, 2)
+        self.assertEqual(TestModel.objects.get(pk=1000).text_field, "updated")
+        self.assertEqual(TestModel.objects.get(pk=1001).text_field, "")
+
+        count = TestModel.objects.copy_from_iterable(
+            (
+                {"id": i, "text_field": str(i), "foreign_key": 1}
+                for i in range(2000, 2025)
+            ),
+            batch_size=10,
+        )
+        self.assertEqual(count, 25)
+        obj = TestModel.objects.get(pk=2024)
+        self.assertEqual(obj.array_field, [])
+        self.assertEqual(obj.foreign_key_id, 1)
+
+        count = TestModel.objects.copy_from_df(
+            pd.DataFrame(
+                [
+                    {"id": 500, "text_field": "a", "foreign_key": 1},
+                    {"id": 501, "text_field": "b", "foreign_key": None},
+                ]
+            )
+        )
+        self.assertEqual(count, 2)
+        self.assertEqual(TestModel.objects.get(pk=500).foreign_key_id, 1)
+        self.assertIsNone(TestModel.objects.get(pk=501).foreign_key_id)
+
+        count = TestModel.objects.copy_from_iterable(
+            [
+                {"id": 600, "text_field": "a", "array_field": ["x"]},
+                {"id": 601, "text_field": "b"},
+            ]
+        )
+        self.assertEqual(count, 2)
+        self.assertEqual(TestModel.objects.get(pk=600).array_field, ["x"])
+        self.assertEqual(TestModel.objects.get(pk=601).array_field, [])
+
+        TestModel.objects.filter(pk=1000).update(array_field=["keep"])
+        count = TestModel.objects.copy_from_df(
+            pd.DataFrame([{"id": 1000, "text_field": "partial"}]),
+            conflict="update",
+            unique_fields=["id"],
+        )
+        self.assertEqual(count, 1)
+        obj = TestModel.objects.get(pk=1000)
+        self.assertEqual(obj.text_field, "partial")
+        self.assertEqual(obj.array_field, ["keep"])
+
+        second = SecondTestModel.objects.order_by("pk").first()
+        SecondTestModel.objects.filter(pk=second.pk).update(dummy_field="custom")
+        total = SecondTestModel.objects.count()
+        count = SecondTestModel.objects.copy_from_df(
+            pd.DataFrame([{"pk": second.pk, "text_field": "partial"}]),
+            conflict="update",
+            unique_fields=["pk"],
+        )
+        self.assertEqual(count, 1)
+        self.assertEqual(SecondTestModel.objects.count(), total)
+        second.refresh_from_db()
+        self.assertEqual(second.text_field, "partial")
+        self.assertEqual(second.dummy_field, "custom")
+
     def test_fuzzy_ratio(self):
 
         result = TestModel.objects.all().fuzzy_ratios(
@@ -241,6 +935,102 @@ class ManagerTests(DjangoTestCase):
         self.assertEqual(result.pk, 1)
         self.assertEqual(fuzzy_ratio, 100)
 
+        from rapidfuzz import fuzz
+
+        for allow_partial in [False, True]:
+            expected = sorted(
+                (
+                    max(
+                        fuzz.ratio(obj.text_field, "quick movie review"),
+                        fuzz.partial_ratio(obj.text_field, "quick movie review")
+                        if allow_partial
+                        else 0,
+                    ),
+                    obj.pk,
+                )
+                for obj in TestModel.objects.all()
+            )
+            expected = [(r, pk) for r, pk in expected if r >= 30]
+            result = TestModel.objects.all().fuzzy_ratios(
+                ["text_field"],
+                "quick movie review",
+                min_ratio=30,
+                allow_partial=allow_partial,
+                batch_size=7,
+            )
+            self.assertEqual(
+                sorted((r["fuzzy_ratio"], r["pk"]) for r in result), expected
+            )
+            top = TestModel.objects.all().fuzzy_ratios(
+                ["text_field"],
+                "quick movie review",
+                allow_partial=allow_partial,
+                limit=5,
+                batch_size=7,
+            )
+            self.assertEqual(len(top), 5)
+            self.assertEqual(top[0]["pk"], 1)
+            self.assertEqual(
+                [r["fuzzy_ratio"] for r in top],
+                sorted(
+                    [
+                        r["fuzzy_ratio"]
+                        for r in TestModel.objects.all().fuzzy_ratios(
+                            ["text_field"],
+                            "quick movie review",
+                            allow_partial=allow_partial,
+                        )
+                    ],
+                    reverse=True,
+                )[:5],
+            )
+
+    def test_fuzzy_ratios_many(self):
+
+        texts = ["quick movie review", "terrible film", "quick movie review"]
+        for allow_partial in [False, True]:
+            results = TestModel.objects.all().fuzzy_ratios_many(
+                ["text_field"],
+                texts,
+                allow_partial=allow_partial,
+                top_k=5,
+                batch_size=7,
+                text_batch_size=2,
+            )
+            self.assertEqual(len(results), 3)
+            for text, matches in zip(texts, results):
+                expected = TestModel.objects.all().fuzzy_ratios(
+                    ["text_field"],
+                    text,
+                    allow_partial=allow_partial,
+                    limit=5,
+                    batch_size=7,
+                )
+                self.assertEqual(matches, expected)
+            self.assertEqual(results[0], results[2])
+
+        results = TestModel.objects.all().fuzzy_ratios_many(
+            ["text_field"], ["quick movie review"], min_ratio=30, top_k=None
+        )
+        self.assertEqual(
+            results[0],
+            TestModel.objects.all().fuzzy_ratios(
+                ["text_field"], "quick movie review", min_ratio=30
+            ),
+        )
+        self.assertEqual(TestModel.objects.all().fuzzy_ratios_many(["text_field"], []), [])
+
+        with self.assertNumQueries(2):
+            matches = TestModel.objects.all().fuzzy_best_matches(
+                ["text_field"],
+                ["quick movie review", "zzzzzzzzzzzzzzzzzzzzzzzzzzzzzz"],
+                allow_partial=True,
+                min_ratio=90,
+            )
+        self.assertEqual(matches[0][0].pk, 1)
+        self.assertEqual(matches[0][1], 100)
+        self.assertIsNone(matches[1])
+
     def test_levenshtein_difference(self):
 
         result = TestModel.objects.all().levenshtein_differences(
@@ -269,6 +1059,100 @@ class ManagerTests(DjangoTestCase):
         self.assertEqual(result.pk, 1)
         self.assertAlmostEqual(similarity, 0.35, 2)
 
+    def test_tfidf_index(self):
+
+        import tempfile
+        from django_pewtils.managers import TfidfIndex
+
+        index = TestModel.objects.all().tfidf_index(["text_field"])
+        self.assertEqual(len(index), TestModel.objects.count())
+        with self.assertNumQueries(1):
+            expected = TestModel.objects.all().tfidf_similarities(
+                ["text_field"], "quick movie review"
+            )
+        self.assertEqual(len(expected), TestModel.objects.count())
+        self.assertEqual(set(expected[0].keys()), {"pk", "text_field", "similarity"})
+        similarities = [r["similarity"] for r in expected]
+        self.assertEqual(similarities, sorted(similarities, reverse=True))
+        filtered = TestModel.objects.all().tfidf_similarities(
+            ["text_field"], "quick movie review", min_similarity=0.1
+        )
+        self.assertEqual(filtered, [r for r in expected if r["similarity"] >= 0.1])
+        self.assertEqual(
+            TestModel.objects.none().tfidf_similarities(["text_field"], "test"), []
+        )
+        result = TestModel.objects.all().tfidf_similarities(
+            ["text_field"], "quick movie review", index=index
+        )
+        self.assertEqual([r["pk"] for r in result], [r["pk"] for r in expected])
+        for r, e in zip(result, expected):
+            self.assertAlmostEqual(r["similarity"], e["similarity"], 6)
+            self.assertEqual(r["text_field"], e["text_field"])
+
+        top = index.query("quick movie review", top_k=3)
+        self.assertEqual(
+            top,
+            [{"pk": r["pk"], "similarity": r["similarity"]} for r in result[:3]],
+        )
+        result = TestModel.objects.filter(pk__gt=1).tfidf_similarities(
+            ["text_field"], "quick movie review", index=index, min_similarity=0.01
+        )
+        self.assertNotIn(1, [r["pk"] for r in result])
+        self.assertTrue(all(r["similarity"] >= 0.01 for r in result))
+
+        obj = TestModel.objects.get(pk=2)
+        obj.text_field = "quick movie review"
+        obj.save()
+        index.refresh(TestModel.objects.filter(pk=2))
+        self.assertEqual(len(index), TestModel.objects.count())
+        similarities = {
+            r["pk"]: r["similarity"] for r in index.query("quick movie review")
+        }
+        self.assertAlmostEqual(similarities[2], 1.0, 6)
+        index.remove([2])
+        self.assertEqual(len(index), TestModel.objects.count() - 1)
+        self.assertNotIn(2, [r["pk"] for r in index.query("quick movie review")])
+
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, "index.pkl")
+            index.save(path)
+            loaded = TfidfIndex.load(path)
+        self.assertEqual(
+            loaded.query("quick movie review"), index.query("quick movie review")
+        )
+        with self.assertRaises(ValueError):
+            index.refresh(SecondTestModel.objects.all())
+
+        self.assertEqual(
+            [r["pk"] for r in index.query("quick movie review", pks=[3, 4, 5])],
+            [
+                r["pk"]
+                for r in index.query("quick movie review", top_k=None)
+                if r["pk"] in (3, 4, 5)
+            ],
+        )
+        with self.assertNumQueries(1):
+            TestModel.objects.filter(pk__lt=10).tfidf_similarities(
+                ["text_field"], "quick movie review", index=index
+            )
+
+        with self.assertRaises(ValueError):
+            TestModel.objects.all().tfidf_similarities(
+                ["array_field"], "quick movie review", index=index
+            )
+
+        empty = TestModel.objects.none().tfidf_index(["text_field"])
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(empty.query("quick movie review"), [])
+        self.assertEqual(
+            TestModel.objects.all().tfidf_similarities(
+                ["text_field"], "quick movie review", index=empty
+            ),
+            [],
+        )
+        empty.refresh(TestModel.objects.filter(pk=1))
+        self.assertEqual(empty.query("quick movie review")[0]["pk"], 1)
+
     def test_trigram_similarity(self):
 
         result = TestModel.objects.all().trigram_similarities(
@@ -283,6 +1167,35 @@ class ManagerTests(DjangoTestCase):
         self.assertEqual(result.pk, 1)
         self.assertAlmostEqual(similarity, 0.134, 2)
 
+        result = TestModel.objects.all().fuzzy_ratios(
+            ["text_field"],
+            "quick movie review",
+            allow_partial=True,
+            prefilter=True,
+            candidate_limit=5,
+            similarity_threshold=0.1,
+        )
+        self.assertLessEqual(len(result), 5)
+        self.assertEqual(result[0]["pk"], 1)
+        self.assertEqual(result[0]["fuzzy_ratio"], 100)
+        self.assertNotIn("similarity", result[0])
+
+        from django.db import connection, transaction
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW pg_trgm.similarity_threshold")
+                threshold = cursor.fetchone()[0]
+            TestModel.objects.all().fuzzy_ratios(
+                ["text_field"],
+                "quick movie review",
+                prefilter=True,
+                similarity_threshold=0.1,
+            )
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW pg_trgm.similarity_threshold")
+                self.assertEqual(cursor.fetchone()[0], threshold)
+
     def test_postgres_search(self):
 
         results = TestModel.objects.all().postgres_search(
@@ -299,3 +1212,52 @@ class ManagerTests(DjangoTestCase):
         cache_path = os.path.join(settings.BASE_DIR, settings.LOCAL_CACHE_ROOT)
         if os.path.exists(cache_path):
             shutil.rmtree(cache_path)
+
+
+class ParallelManagerTests(TransactionTestCase):
+    """
+    Worker processes can only see committed data, so these tests run outside of a transaction.
+    """
+
+    def test_parallel_map(self):
+
+        for i in range(30):
+            TestModel.objects.create(id=i, text_field="x" * i)
+        results, errors = TestModel.objects.filter(pk__gte=1).parallel_map(
+            _text_length, size=4, workers=3
+        )
+        self.assertEqual(results, {i: i for i in range(1, 30) if i != 3})
+        self.assertEqual(list(errors.keys()), [3])
+
+        with patch("django_pewtils.managers._has_integer_pk", return_value=False):
+            results, errors = TestModel.objects.filter(pk__gte=1).parallel_map(
+                _text_length, size=4, workers=3
+            )
+        self.assertEqual(results, {i: i for i in range(1, 30) if i != 3})
+        self.assertEqual(list(errors.keys()), [3])
+
+
+class ServerSideCursorTests(TransactionTestCase):
+    """
+    Server-side cursors are opened `WITH HOLD` in autocommit mode, so these tests run outside of a transaction.
+    """
+
+    def test_server_side_cursor_chunks(self):
+
+        from django.db import connection
+
+        for i in range(30):
+            TestModel.objects.create(id=i, text_field=str(i))
+        self.assertTrue(connection.get_autocommit())
+        self.assertFalse(connection.in_atomic_block)
+
+        items = list(TestModel.objects.all().chunk(size=4, server_side_cursor=True))
+        self.assertEqual(sorted(item.pk for item in items), list(range(30)))
+
+        TestModel.objects.filter(pk__gte=10).chunk_update(
+            size=4, tqdm_desc=None, server_side_cursor=True, text_field="updated"
+        )
+        self.assertEqual(TestModel.objects.filter(text_field="updated").count(), 20)
+        self.assertEqual(
+            TestModel.objects.filter(pk__lt=10, text_field="updated").count(), 0
+        )